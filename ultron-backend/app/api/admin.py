@@ -0,0 +1,56 @@
+# app/api/admin.py
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core import config
+from app.core.profiling import profile_process, request_profiles, slow_requests
+from app.core.streams import stream_registry
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    # Without a configured ADMIN_TOKEN the admin surface does not exist
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def sample_process(seconds: float = 10.0, interval_ms: float = 5.0):
+    # Collapsed stacks: feed to flamegraph.pl or open in speedscope
+    seconds = min(max(seconds, 0.1), 120.0)
+    interval_ms = min(max(interval_ms, 1.0), 100.0)
+    collapsed = await profile_process(seconds, interval_ms / 1000)
+    if collapsed is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": 'attachment; filename="ultron-profile.folded"'},
+    )
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_request_profile(profile_id: str):
+    collapsed = request_profiles.get(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found (the request may still be running)")
+    return collapsed
+
+
+@router.get("/streams")
+def list_active_streams():
+    # Stream ids are enough to cancel a generation, so only admins get to see them
+    return {"streams": stream_registry.active()}
+
+
+@router.get("/slow-requests")
+def list_slow_requests(limit: int = 20, path: Optional[str] = None):
+    captured = [r for r in reversed(slow_requests) if path is None or r["path"].startswith(path)]
+    return {"threshold_ms": config.SLOW_REQUEST_MS, "requests": captured[:limit]}
@@ -0,0 +1,57 @@
+# app/api/batch.py
+
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+
+from app.services.batch_service import BatchInputError, batch_runner
+
+router = APIRouter(prefix="/batch")
+
+
+@router.post("/jobs")
+async def create_batch_job(
+    file: UploadFile = File(...),
+    persona: str = Form(...),
+    model: Optional[str] = Form(default=None),
+):
+    # Each line is {"prompt": "...", "id"?: "...", "persona"?: "...", "model"?: "..."} or a bare JSON string
+    content = await file.read()
+    try:
+        job = batch_runner.create_job(content, persona, model)
+    except BatchInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return batch_runner.status(job["id"])
+
+
+@router.get("/jobs")
+def list_batch_jobs():
+    jobs = sorted(batch_runner.jobs.values(), key=lambda j: j["created_at"], reverse=True)
+    return {"jobs": [batch_runner.status(j["id"]) for j in jobs]}
+
+
+@router.get("/jobs/{job_id}")
+def get_batch_job(job_id: str):
+    status = batch_runner.status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return status
+
+
+@router.get("/jobs/{job_id}/results")
+def download_batch_results(job_id: str):
+    if job_id not in batch_runner.jobs:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    path = batch_runner.results_path(job_id)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="No results yet")
+    return FileResponse(path, media_type="application/x-ndjson", filename=f"batch-{job_id}.jsonl")
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_batch_job(job_id: str):
+    job = batch_runner.cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return batch_runner.status(job_id)
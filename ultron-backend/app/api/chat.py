@@ -1,23 +1,35 @@
-from unittest import result
-from fastapi import APIRouter, Body, HTTPException, Depends
-from httpx import request
+from typing import Optional
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response
 from app.models.chat_model import ChatRequest, ChatResponse, ChatListResponse, ChatCreate, NewChatResponse, RenameChatRequest, RenameChatResponse, MessageCreate, MessageResponse,ChatCreateRequest
+from app.models.chat_model import BulkChatFilter, BulkMoveRequest, BulkChatResponse
 from app.services.chat_service import process_chat
 from fastapi.responses import StreamingResponse,JSONResponse
-import ollama
 from app.services.local_chat_storage import save_message_locally
 from app.utils.chat_service import create_streaming_response
 from app.core.database import SessionLocal
 from app.models.db_models import Chat, Message, Category
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session, joinedload
 from app.core.database import get_db
+from app.core.streams import stream_registry
+from app.core.change_feed import change_feed
+from app.services.local_chat_storage import touch_chat, touch_category
+from app.utils.http_cache import make_etag, is_not_modified, not_modified
+from app.services.chat_maintenance import bulk_delete_chats, bulk_move_chats
 
 
 router = APIRouter()
 
 
+def _naive_utc(since: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC; clients usually send ISO strings with "Z"
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
 @router.post("/chat/mistral", response_model=ChatResponse)
 async def chat_mistral(request: ChatRequest):
     result = process_chat(request.message, request.history)
@@ -55,23 +67,12 @@ async def chat_llava(request: ChatRequest):
 
 
 @router.post("/chat/mistral/stream")
-async def chat_mistral_stream(request: ChatRequest):
-    system_prompt = (
-        "You are Ultron AI, a professional, friendly, and highly knowledgeable assistant. "
-        "Respond in a clear, concise, and structured format. Always follow these style rules:\n\n"
-        "1. **Use bullet points (📌)** for listing items.\n"
-        "2. **Use emojis 🤖** sparingly and purposefully for friendliness.\n"
-        "3. **Use bold text** for emphasis.\n"
-        "4. **Use markdown formatting** for headings and clarity.\n"
-        "5. **Avoid emoji numbers like 1️⃣, 2️⃣ – use 1., 2. instead.\n"
-        "6. **Add line breaks between bullet points**.\n\n"
-        "Maintain a respectful, intelligent tone."
-    )
-    return await create_streaming_response("mistral", request, system_prompt)
+async def chat_mistral_stream(request: ChatRequest, http_request: Request):
+    return await create_streaming_response("mistral", request, http_request)
 
 
 @router.post("/chat/llama3-chat/stream")
-async def chat_llama3_chat_stream(request: ChatRequest):
+async def chat_llama3_chat_stream(request: ChatRequest, http_request: Request):
 
     if not request.chat_id:
         raise HTTPException(status_code=400, detail="chat_id is required")
@@ -82,16 +83,6 @@ async def chat_llama3_chat_stream(request: ChatRequest):
     db.close()
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
-    
-    system_prompt = (
-    "**You are Ultron Chat 🤖, a helpful, friendly, and professional AI assistant.**\n\n"
-    "• Engage in thoughtful and natural conversations.\n"
-    "• Answer in a clear, concise, and polite tone.\n"
-    "• Add a touch of friendliness with relevant emojis when needed 😊.\n"
-    "• Never hallucinate facts – respond honestly if unsure.\n"
-    "• Always stay aligned with the context and user intent.\n\n"
-    "Provide responses that are intelligent, respectful, and helpful."
-)
 
     print("🔥 Incoming ChatRequest:", request)
     print("📨 Message:", request.message)
@@ -99,153 +90,93 @@ async def chat_llama3_chat_stream(request: ChatRequest):
     print("📁 Filenames:", request.filenames)
     print("📂 Category ID:", request.category)
 
-    return await create_streaming_response("llama3:8b", request.chat_id,request, system_prompt)
+    return await create_streaming_response("llama3-chat", request, http_request)
 
 
 
 @router.post("/chat/llama3-document/stream")
-async def chat_llama3_document_stream(request: ChatRequest):
-    system_prompt = (
-        "**You are Ultron Docs 📄, a professional document analyst and summarizer.**\n\n"
-        "• Analyze the uploaded document carefully.\n"
-        "• Provide a structured and bullet-point summary of its key contents.\n"
-        "• Identify sections such as title, headers, and major paragraphs.\n"
-        "• If it's a formal document (e.g., resume, letter), evaluate tone and grammar.\n"
-        "• Always return structured results with markdown formatting.\n\n"
-        "Keep your analysis professional and aligned with document type."
-    )
-
+async def chat_llama3_document_stream(request: ChatRequest, http_request: Request):
     print("🔥 Incoming ChatRequest:", request)
     print("📨 Message:", request.message)
     print("🕘 History:", request.history)
     print("📁 Filenames:", request.filenames)
     print("📂 Category ID:", request.category)
 
-    return await create_streaming_response("llama3:8b", "Document", request, system_prompt)
+    return await create_streaming_response("llama3-document", request, http_request)
 
 
 
 @router.post("/chat/llama3-writing/stream")
-async def chat_llama3_writing_stream(request: ChatRequest):
-    system_prompt = (
-        "**You are Ultron Writer ✍️, an expert writing assistant.**\n\n"
-        "• Help users write blogs, stories, essays, letters, and more.\n"
-        "• Use engaging and professional language suited to the request.\n"
-        "• Suggest improvements in tone, structure, and clarity.\n"
-        "• Ensure grammatical correctness and good flow.\n"
-        "• Offer rewrite options or enhancements when applicable.\n\n"
-        "Always be creative yet clear in expression."
-    )
-
+async def chat_llama3_writing_stream(request: ChatRequest, http_request: Request):
     print("🔥 Incoming ChatRequest:", request)
     print("📨 Message:", request.message)
     print("🕘 History:", request.history)
     print("📁 Filenames:", request.filenames)
     print("📂 Category ID:", request.category)
 
-    return await create_streaming_response("llama3:8b", "Writing", request, system_prompt)
+    return await create_streaming_response("llama3-writing", request, http_request)
 
 
 
 
 @router.post("/chat/llama3-knowledge/stream")
-async def chat_llama3_knowledge_stream(request: ChatRequest):
-    system_prompt = (
-        "**You are Ultron Sage 📚, a knowledgeable assistant trained in diverse fields.**\n\n"
-        "• Provide accurate and fact-based answers.\n"
-        "• Break down complex topics into digestible points.\n"
-        "• Use bullet points or numbered lists where needed.\n"
-        "• Always verify and be cautious of hallucinating data.\n"
-        "• Clarify terms, references, or jargon on request.\n\n"
-        "Your tone should be confident, neutral, and informative."
-    )
-
+async def chat_llama3_knowledge_stream(request: ChatRequest, http_request: Request):
     print("🔥 Incoming ChatRequest:", request)
     print("📨 Message:", request.message)
     print("🕘 History:", request.history)
     print("📁 Filenames:", request.filenames)
     print("📂 Category ID:", request.category)
 
-    return await create_streaming_response("llama3:8b", "Knowledge", request, system_prompt)
+    return await create_streaming_response("llama3-knowledge", request, http_request)
 
 
 
 @router.post("/chat/llama3-voice/stream")
-async def chat_llama3_voice_stream(request: ChatRequest):
-    system_prompt = (
-        "**You are Ultron Voice 🎙️, a voice conversation and transcription assistant.**\n\n"
-        "• Transcribe or understand spoken content accurately.\n"
-        "• Convert voice queries into actionable text instructions.\n"
-        "• Maintain tone, context, and natural language flow.\n"
-        "• Help convert speech into readable and structured outputs.\n"
-        "• Use punctuation, formatting, and markdown when needed.\n\n"
-        "Be precise and listener-friendly in your responses."
-    )
-
-
+async def chat_llama3_voice_stream(request: ChatRequest, http_request: Request):
     print("🔥 Incoming ChatRequest:", request)
     print("📨 Message:", request.message)
     print("🕘 History:", request.history)
     print("📁 Filenames:", request.filenames)
     print("📂 Category ID:", request.category)
 
-    return await create_streaming_response("llama3:8b", "Voice", request, system_prompt)
+    return await create_streaming_response("llama3-voice", request, http_request)
 
 
 @router.post("/chat/llava/stream")
-async def chat_llava_stream(request: ChatRequest):
-    system_prompt = (
-        "**You are Ultron Vision 👁️, a multimodal assistant that understands and explains images.**\n\n"
-        "• Analyze the uploaded image with attention to detail.\n"
-        "• Provide a clear and structured interpretation of the contents.\n"
-        "• Mention objects, colors, layouts, and any notable patterns or issues.\n"
-        "• For diagrams or screenshots, explain any text or UI components.\n"
-        "• If user asks questions, answer based strictly on the visual input.\n\n"
-        "Use bullet points for clarity and concise breakdown."
-    )
-
-
-    return await create_streaming_response("llava", "Image", request, system_prompt)
+async def chat_llava_stream(request: ChatRequest, http_request: Request):
+    return await create_streaming_response("llava", request, http_request)
 
 
 @router.post("/chat/gemma3/stream")
-async def chat_gemma3_stream(request: ChatRequest):
-    system_prompt = (
-        "You are Ultron AI, a professional, friendly, and highly knowledgeable assistant. "
-        "Respond in a clear, concise, and structured format. Always follow these style rules:\n\n"
-        "1. **Use bullet points (📌)** for listing items.\n"
-        "2. **Use emojis 🤖** sparingly and purposefully for friendliness.\n"
-        "3. **Use bold text** for emphasis.\n"
-        "4. **Use markdown formatting** for headings and clarity.\n"
-        "5. **Avoid emoji numbers like 1️⃣, 2️⃣ – use 1., 2. instead.\n"
-        "6. **Add line breaks between bullet points**.\n\n"
-        "Maintain a respectful, intelligent tone."
-    )
-
-    return await create_streaming_response("gemma3:12b", "Chat", request, system_prompt)
+async def chat_gemma3_stream(request: ChatRequest, http_request: Request):
+    return await create_streaming_response("gemma3", request, http_request)
 
 
 @router.post("/chat/deepseek-coder/stream")
-async def chat_deepseek_coder_stream(request: ChatRequest):
-    system_prompt = (
-    "**You are Ultron Coder 👨‍💻, an expert AI software engineer and code assistant.**\n\n"
-    "• Help users with writing, debugging, and explaining code in multiple languages.\n"
-    "• Prioritize clean, efficient, and well-commented code.\n"
-    "• Avoid unnecessary explanations unless asked.\n"
-    "• Provide step-by-step logic for complex problems.\n"
-    "• Stick to best practices and modern standards (e.g., PEP8, modularity).\n\n"
-    "Reply strictly in code blocks where applicable."
-)
+async def chat_deepseek_coder_stream(request: ChatRequest, http_request: Request):
+    return await create_streaming_response("deepseek-coder", request, http_request)
 
 
+# cancelling an in-flight stream
 
-    return await create_streaming_response("deepseek-coder:6.7b", "Code", request, system_prompt)
+@router.post("/streams/{stream_id}/cancel")
+async def cancel_stream(stream_id: str):
+    stream = stream_registry.cancel(stream_id, reason="client")
+    if not stream:
+        raise HTTPException(status_code=404, detail="Stream not found or already finished")
+    return {"message": "Stream cancelled", "id": stream.id, "tokens_generated": stream.tokens}
 
 
 #fetching all chats for a category(done)
 
 @router.get("/chats/{category_slug}", response_model=ChatListResponse)
-def get_chats_by_category_slug(category_slug: str):
+def get_chats_by_category_slug(
+    category_slug: str,
+    request: Request,
+    response: Response,
+    since: Optional[datetime] = None,
+):
+    since = _naive_utc(since)
     db = SessionLocal()
     try:
         category_slug = category_slug.capitalize()
@@ -253,13 +184,17 @@ def get_chats_by_category_slug(category_slug: str):
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
 
-        chats = (
-            db.query(Chat)
-            .filter(Chat.category_id == category.id)
-            .order_by(Chat.created_at.desc())
-            .all()
-        )
+        # The category version moves on every write to its chats, so it is enough for the ETag
+        etag = make_etag("category", category.id, category.version, since)
+        if is_not_modified(request, etag):
+            return not_modified(etag, "category_chats")
+
+        query = db.query(Chat).filter(Chat.category_id == category.id)
+        if since:
+            query = query.filter(Chat.updated_at > since)
+        chats = query.order_by(Chat.created_at.desc()).all()
 
+        response.headers["ETag"] = etag
         return {
             "chats": [
                 {
@@ -267,9 +202,12 @@ def get_chats_by_category_slug(category_slug: str):
                     "chat_name": chat.chat_name,
                     "created_at": chat.created_at,
                     "category": category.name if category else "unknown",
+                    "updated_at": chat.updated_at,
+                    "version": chat.version,
                 }
                 for chat in chats
-            ]
+            ],
+            "watermark": max((c.updated_at for c in chats if c.updated_at), default=since or category.updated_at),
         }
     finally:
         db.close()
@@ -300,9 +238,12 @@ def create_chat(chat: ChatCreate = Body(...)):
         )
 
         # Step 3: Save to DB
+        new_chat.updated_at = now
         db.add(new_chat)
+        touch_category(db, category.id, now)
         db.commit()
         db.refresh(new_chat)
+        change_feed.publish("chat.created", chat_id=new_chat.id, category_id=category.id)
 
         return {
             "id": new_chat.id,
@@ -327,7 +268,9 @@ def rename_chat(chat_id: str, payload: RenameChatRequest):
         if not chat:
             raise HTTPException(status_code=404, detail="Chat not found")
         chat.chat_name = payload.new_title
+        touch_chat(db, chat)
         db.commit()
+        change_feed.publish("chat.updated", chat_id=chat.id, category_id=chat.category_id)
         return {"message": "Chat renamed successfully"}
     finally:
         db.close()
@@ -341,63 +284,128 @@ def rename_chat(chat_id: str, payload: RenameChatRequest):
 def delete_chat(chat_id: str):
     db = SessionLocal()
     try:
-        chat = db.query(Chat).filter(Chat.id == chat_id).first()
+        chat = db.query(Chat.category_id).filter(Chat.id == chat_id).first()
         if not chat:
             raise HTTPException(status_code=404, detail="Chat not found")
-        db.delete(chat)
+        # Set-based: the messages are deleted without being loaded
+        db.query(Message).filter(Message.chat_id == chat_id).delete(synchronize_session=False)
+        db.query(Chat).filter(Chat.id == chat_id).delete(synchronize_session=False)
+        touch_category(db, chat.category_id)
         db.commit()
+        change_feed.publish("chat.deleted", chat_id=chat_id, category_id=chat.category_id)
         return {"message": "Chat deleted successfully"}
     finally:
         db.close()
 
 
+# bulk delete / move, by ids, category or age
 
-# Fetching recent chats
+def _bulk_filters(db: Session, payload: BulkChatFilter) -> dict:
+    filters = {}
+    if payload.ids is not None:
+        filters["ids"] = payload.ids
+    if payload.category:
+        category = db.query(Category).filter(Category.name == payload.category.capitalize()).first()
+        if not category:
+            raise HTTPException(status_code=404, detail="Category not found")
+        filters["category_id"] = category.id
+    if payload.older_than_days is not None:
+        filters["older_than"] = datetime.utcnow() - timedelta(days=payload.older_than_days)
+    if not filters:
+        raise HTTPException(status_code=400, detail="Give ids, a category or older_than_days")
+    return filters
 
-@router.get("/recent-chats", response_model=ChatListResponse)
-def get_recent_chats():
-    db = SessionLocal()
-    recent_chats = (
-        db.query(Chat)
-        .options(joinedload(Chat.category), joinedload(Chat.messages))  # load category and messages
-        .order_by(Chat.created_at.desc())
-        .limit(10)
-        .all()
-    )
 
-    result = []
-    for chat in recent_chats:
-        last_message = None
-        if chat.messages:
-            # Sort messages by created_at descending, take first as last message
-            sorted_msgs = sorted(chat.messages, key=lambda m: m.timestamp, reverse=True)
-            last_message = sorted_msgs[0].message  # or .text
+@router.post("/chats/bulk-delete", response_model=BulkChatResponse)
+def bulk_delete(payload: BulkChatFilter, db: Session = Depends(get_db)):
+    return {"affected": bulk_delete_chats(db, **_bulk_filters(db, payload))}
 
-        result.append({
-            "id": str(chat.id),
-            "chat_name": chat.chat_name,
-            "created_at": chat.created_at.isoformat(),
-            "category": chat.category.name if chat.category else "unknown",
-            "last_message": last_message or ""
-        })
 
-    return {"chats": result}
+@router.post("/chats/bulk-move", response_model=BulkChatResponse)
+def bulk_move(payload: BulkMoveRequest, db: Session = Depends(get_db)):
+    target = db.query(Category).filter(Category.name == payload.target_category.capitalize()).first()
+    if not target:
+        raise HTTPException(status_code=404, detail="Target category not found")
+    return {"affected": bulk_move_chats(db, target.id, **_bulk_filters(db, payload))}
 
 
 
+# Fetching recent chats
+
+@router.get("/recent-chats", response_model=ChatListResponse)
+def get_recent_chats(request: Request, response: Response, since: Optional[datetime] = None):
+    since = _naive_utc(since)
+    db = SessionLocal()
+    try:
+        # Every chat write (including deletes and retention purges) publishes to the change
+        # feed, so its position identifies the list without touching the table. The epoch
+        # changes on restart; each worker process has its own feed and epoch
+        etag = make_etag("recent", change_feed.epoch, change_feed.seq, since)
+        if is_not_modified(request, etag):
+            return not_modified(etag, "recent_chats")
+
+        # Served from ix_chats_updated
+        last_update = db.query(func.max(Chat.updated_at)).scalar()
+
+        # Only the newest message per chat, instead of loading every message
+        last_message = (
+            select(Message.message)
+            .where(Message.chat_id == Chat.id)
+            .order_by(Message.timestamp.desc())
+            .limit(1)
+            .correlate(Chat)
+            .scalar_subquery()
+        )
+        query = db.query(Chat, last_message).options(joinedload(Chat.category))
+        if since:
+            query = query.filter(Chat.updated_at > since)
+        recent_chats = query.order_by(Chat.created_at.desc()).limit(10).all()
+
+        result = []
+        for chat, last in recent_chats:
+            result.append({
+                "id": str(chat.id),
+                "chat_name": chat.chat_name,
+                "created_at": chat.created_at.isoformat(),
+                "category": chat.category.name if chat.category else "unknown",
+                "last_message": last or "",
+                "updated_at": chat.updated_at,
+                "version": chat.version,
+            })
+
+        response.headers["ETag"] = etag
+        return {"chats": result, "watermark": last_update}
+    finally:
+        db.close()
+
 
 
 
 @router.get("/chats/{chat_id}/messages")
-def get_chat_messages(chat_id: str, db: Session = Depends(get_db)):
-    messages = (
-        db.query(Message)
-        .filter(Message.chat_id == chat_id)
-        .order_by(Message.timestamp.asc())
-        .all()
-    )
-
-    if not messages:
+def get_chat_messages(
+    chat_id: str,
+    request: Request,
+    response: Response,
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    since = _naive_utc(since)
+    chat = db.query(Chat.version, Chat.updated_at).filter(Chat.id == chat_id).first()
+    if chat is not None:
+        # The chat version is bumped with every message saved to it
+        etag = make_etag("messages", chat_id, chat.version, since)
+        if is_not_modified(request, etag):
+            return not_modified(etag, "chat_messages")
+        response.headers["ETag"] = etag
+        if chat.updated_at:
+            response.headers["X-Watermark"] = chat.updated_at.isoformat()
+
+    query = db.query(Message).filter(Message.chat_id == chat_id)
+    if since:
+        query = query.filter(Message.timestamp > since)
+    messages = query.order_by(Message.timestamp.asc()).all()
+
+    if not messages and not since:
         raise HTTPException(status_code=404, detail="No messages found for this chat")
 
     return [
@@ -407,11 +415,19 @@ def get_chat_messages(chat_id: str, db: Session = Depends(get_db)):
             "content": m.message,
             "role": m.role,
             "created_at": m.timestamp.isoformat() if m.timestamp else None,
+            "status": m.status or "complete",
         }
         for m in messages
     ]
 
 
+# change feed: long-poll instead of re-fetching lists
+
+@router.get("/changes")
+async def get_changes(since: int = 0, epoch: Optional[str] = None, timeout: float = 25.0):
+    return await change_feed.wait(since, min(max(timeout, 0.0), 60.0), epoch)
+
+
 chats_db = {}
 
 @router.post("/chats/{chat_id}/messages", response_model=MessageResponse)
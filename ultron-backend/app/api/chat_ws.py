@@ -0,0 +1,165 @@
+# app/api/chat_ws.py
+
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+
+from app.core.admission import client_id_for
+from app.core.config import ALLOWED_ORIGINS, HISTORY_MAX_TURNS, WS_MAX_STREAMS_PER_CONNECTION, WS_SEND_QUEUE_SIZE
+from app.core.database import SessionLocal
+from app.models.db_models import Chat
+from app.services.local_chat_storage import load_chat_history
+from app.utils.chat_service import start_chat_stream
+
+router = APIRouter()
+
+# One connection per client carries many chat streams, told apart by a client-chosen "id".
+#
+# client -> server
+#   {"type": "chat", "id": "s1", "persona": "llama3-chat", "chat_id": "...", "message": "...", "filenames": []}
+#   {"type": "cancel", "id": "s1"}
+#   {"type": "ping", "ts": 123}
+#
+# server -> client
+#   {"type": "started", "id": "s1", "stream_id": "...", "model": "llama3:8b"}
+#   {"type": "token", "id": "s1", "data": "..."}
+#   {"type": "done", "id": "s1", "status": "complete" | "cancelled", "chunks": 42, "usage": {...}, ...}
+#     (a stream cancelled before it started only gets "status": "cancelled" and "chunks": 0)
+#   {"type": "error", "id": "s1", "status": 429, "detail": "...", "retry_after": 3}
+#   {"type": "pong", "ts": 123}
+#
+# Only the new message is sent; the history comes from the chat stored on the server.
+
+
+def _chat_exists(chat_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Chat.id).filter(Chat.id == chat_id).first() is not None
+    finally:
+        db.close()
+
+
+class ChatConnection:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.client_id = client_id_for(websocket)
+        # A single writer drains this queue; a bounded size pushes back on fast streams
+        self.outbox = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.sessions = {}
+        self.tasks = {}
+        # Ids the client cancelled before their stream started
+        self.cancelled = set()
+
+    async def send(self, frame: dict):
+        await self.outbox.put(frame)
+
+    async def writer(self):
+        while True:
+            frame = await self.outbox.get()
+            await self.websocket.send_json(frame)
+
+    async def handle(self, frame: dict):
+        kind = frame.get("type")
+        if kind == "ping":
+            await self.send({"type": "pong", "ts": frame.get("ts")})
+        elif kind == "cancel":
+            session = self.sessions.get(frame.get("id"))
+            if session:
+                session.stream.cancel("client")
+            elif frame.get("id") in self.tasks:
+                # Still waiting for admission, nothing has been generated yet
+                self.cancelled.add(frame["id"])
+                self.tasks[frame["id"]].cancel()
+        elif kind == "chat":
+            await self.start(frame)
+        else:
+            await self.send({"type": "error", "id": frame.get("id"), "status": 400, "detail": f"Unknown frame type: {kind}"})
+
+    async def start(self, frame: dict):
+        frame_id = frame.get("id")
+        if not frame_id or frame_id in self.tasks:
+            await self.send({"type": "error", "id": frame_id, "status": 400, "detail": "Each stream needs a new, unique id"})
+            return
+        if len(self.tasks) >= WS_MAX_STREAMS_PER_CONNECTION:
+            await self.send({"type": "error", "id": frame_id, "status": 429, "detail": "Too many concurrent streams on this connection"})
+            return
+        self.tasks[frame_id] = asyncio.create_task(self.run(frame_id, frame))
+
+    async def run(self, frame_id: str, frame: dict):
+        try:
+            chat_id = frame.get("chat_id")
+            if not chat_id or not await asyncio.to_thread(_chat_exists, chat_id):
+                raise HTTPException(status_code=404, detail="Chat not found")
+            if not frame.get("message"):
+                raise HTTPException(status_code=400, detail="message is required")
+
+            history = await load_chat_history(chat_id, HISTORY_MAX_TURNS)
+            try:
+                session = await start_chat_stream(
+                    persona=frame.get("persona", "llama3-chat"),
+                    chat_id=chat_id,
+                    message=frame["message"],
+                    history=history,
+                    filenames=frame.get("filenames") or [],
+                    client_id=self.client_id,
+                )
+            except KeyError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            self.sessions[frame_id] = session
+            await self.send({"type": "started", "id": frame_id, "stream_id": session.stream.id, "model": session.route.model})
+            async for chunk in session.output():
+                await self.send({"type": "token", "id": frame_id, "data": chunk})
+            await self.send({"type": "done", "id": frame_id, **session.summary()})
+        except asyncio.CancelledError:
+            if frame_id in self.cancelled:
+                await self.send({"type": "done", "id": frame_id, "status": "cancelled", "chunks": 0})
+            raise
+        except HTTPException as e:
+            error = {"type": "error", "id": frame_id, "status": e.status_code, "detail": e.detail}
+            if e.headers and "Retry-After" in e.headers:
+                error["retry_after"] = int(e.headers["Retry-After"])
+            await self.send(error)
+        except Exception as e:
+            print(f"[ERROR] WebSocket stream {frame_id} failed: {e}")
+            await self.send({"type": "error", "id": frame_id, "status": 500, "detail": "Generation failed"})
+        finally:
+            self.sessions.pop(frame_id, None)
+            self.tasks.pop(frame_id, None)
+            self.cancelled.discard(frame_id)
+
+    async def close(self):
+        for session in list(self.sessions.values()):
+            session.stream.cancel("disconnected")
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    # CORS does not cover WebSockets: without this any page could drive the socket from the user's browser
+    if websocket.headers.get("origin") not in ALLOWED_ORIGINS:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    connection = ChatConnection(websocket)
+    writer = asyncio.create_task(connection.writer())
+    try:
+        while True:
+            try:
+                frame = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                frame = None
+            if not isinstance(frame, dict):
+                await connection.send({"type": "error", "status": 400, "detail": "Frames must be JSON objects"})
+                continue
+            await connection.handle(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await connection.close()
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
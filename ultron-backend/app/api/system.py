@@ -0,0 +1,61 @@
+# app/api/system.py
+
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.core.startup import startup_state, is_ready
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+def liveness():
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+def readiness():
+    started_at = startup_state["started_at"]
+    body = {
+        "ready": is_ready(),
+        "database": startup_state["database"],
+        "models": startup_state["models"],
+        "uptime_seconds": round(time.time() - started_at, 1) if started_at else None,
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+@router.get("/admission/stats")
+def admission_stats():
+    from app.core.admission import admission_controller
+
+    return admission_controller.snapshot()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    from app.core.metrics import render_prometheus
+
+    return render_prometheus()
+
+
+@router.get("/maintenance/retention")
+def retention_status():
+    from app.core import config
+    from app.services.chat_maintenance import retention_state
+
+    return {
+        "retention_days": config.RETENTION_DAYS,
+        "mode": config.RETENTION_MODE,
+        "interval_seconds": config.RETENTION_INTERVAL_SECONDS,
+        **retention_state,
+    }
+
+
+@router.post("/maintenance/retention/run")
+async def run_retention_job(enable_incremental_vacuum: bool = False):
+    from app.services.chat_maintenance import run_retention_now
+
+    return await run_retention_now(enable_incremental_vacuum)
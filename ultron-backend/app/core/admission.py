@@ -0,0 +1,248 @@
+# app/core/admission.py
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+
+from app.core import config
+
+# Rough token estimate for prompts: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+MAX_TRACKED_CLIENTS = 10_000
+
+
+def estimate_request_cost(message: str, history: list, max_tokens: int) -> int:
+    prompt_chars = len(message) + sum(len(m.get("content", "")) for m in history or [])
+    return prompt_chars // CHARS_PER_TOKEN + max_tokens
+
+
+class AdmissionRejected(HTTPException):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, amount: float, now: float | None = None) -> float:
+        """Take `amount` tokens. Returns 0 on success, otherwise seconds until they are available."""
+        self._refill(time.monotonic() if now is None else now)
+        # A single request larger than the bucket is allowed through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+@dataclass
+class Ticket:
+    client_id: str
+    persona: str
+    cost: int
+    admitted_at: float = field(default_factory=time.monotonic)
+    released: bool = False
+
+
+class AdmissionController:
+    """
+    Decides whether a generation may start.
+
+    Requests first pay their estimated token cost from a per-client and a per-persona
+    token bucket (429 when either is empty). They then take one of `max_concurrent`
+    generation slots, or wait in a FIFO queue of at most `max_queue` entries for up to
+    `queue_timeout` seconds (503 when the queue is full, the deadline cannot be met
+    or it expires). Rejections carry a Retry-After header.
+
+    Batch work shares the same slots through `acquire_background`, so interactive
+    and batch generations together never exceed `max_concurrent`.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        client_rate: float,
+        client_burst: float,
+        persona_rate: float,
+        persona_burst: float,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.persona_rate = persona_rate
+        self.persona_burst = persona_burst
+
+        self.active = 0
+        self._waiters = deque()
+        # Batch jobs wait here without a deadline; interactive waiters are served first
+        self._background_waiters = deque()
+        self._client_buckets = OrderedDict()
+        self._persona_buckets = {}
+        # Moving average of how long a generation holds its slot, for queue wait estimates
+        self._avg_hold = 5.0
+        self.stats = {"admitted": 0, "queued_total": 0, "rejected_rate": 0, "rejected_saturated": 0, "background_admitted": 0}
+
+    def _client_bucket(self, client_id: str) -> TokenBucket:
+        bucket = self._client_buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self._client_buckets[client_id] = bucket
+            if len(self._client_buckets) > MAX_TRACKED_CLIENTS:
+                self._client_buckets.popitem(last=False)
+        else:
+            self._client_buckets.move_to_end(client_id)
+        return bucket
+
+    def _persona_bucket(self, persona: str) -> TokenBucket:
+        bucket = self._persona_buckets.get(persona)
+        if bucket is None:
+            bucket = self._persona_buckets[persona] = TokenBucket(self.persona_rate, self.persona_burst)
+        return bucket
+
+    def _expected_wait(self, position: int) -> float:
+        return (position + 1) * self._avg_hold / max(1, self.max_concurrent)
+
+    async def acquire(self, client_id: str, persona: str, cost: int) -> Ticket:
+        now = time.monotonic()
+        client_bucket = self._client_bucket(client_id)
+        persona_bucket = self._persona_bucket(persona)
+
+        wait = client_bucket.try_take(cost, now)
+        if wait:
+            self.stats["rejected_rate"] += 1
+            raise AdmissionRejected(429, "Too many tokens requested, slow down", wait)
+        wait = persona_bucket.try_take(cost, now)
+        if wait:
+            client_bucket.give_back(cost)
+            self.stats["rejected_rate"] += 1
+            raise AdmissionRejected(429, f"Persona '{persona}' is at capacity", wait)
+
+        def reject(detail: str):
+            client_bucket.give_back(cost)
+            persona_bucket.give_back(cost)
+            self.stats["rejected_saturated"] += 1
+            return AdmissionRejected(503, detail, self._expected_wait(len(self._waiters)))
+
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.stats["admitted"] += 1
+            return Ticket(client_id, persona, cost)
+
+        if len(self._waiters) >= self.max_queue:
+            raise reject("Server is busy, queue is full")
+        if self._expected_wait(len(self._waiters)) > self.queue_timeout:
+            raise reject("Server is busy, expected wait exceeds the queue deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats["queued_total"] += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise reject("Server is busy, timed out waiting for a slot")
+        except asyncio.CancelledError:
+            # The caller went away before generating anything: refund its cost, and
+            # pass on a slot that may have been handed over at the same moment
+            client_bucket.give_back(cost)
+            persona_bucket.give_back(cost)
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        self.stats["admitted"] += 1
+        return Ticket(client_id, persona, cost)
+
+    async def acquire_background(self, persona: str) -> Ticket:
+        """A generation slot for batch work: no token buckets, no deadline, lowest priority."""
+        if self.active < self.max_concurrent and not self._waiters and not self._background_waiters:
+            self.active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._background_waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release_slot()
+                raise
+            finally:
+                if waiter in self._background_waiters:
+                    self._background_waiters.remove(waiter)
+
+        self.stats["background_admitted"] += 1
+        return Ticket("batch", persona, 0)
+
+    def release(self, ticket: Ticket):
+        if ticket.released:
+            return
+        ticket.released = True
+        held = time.monotonic() - ticket.admitted_at
+        self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        self._release_slot()
+
+    def _release_slot(self):
+        # Hand the slot straight to the oldest live waiter, otherwise free it
+        for waiters in (self._waiters, self._background_waiters):
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.active -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "background_queued": len(self._background_waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "avg_hold_seconds": round(self._avg_hold, 2),
+            **self.stats,
+        }
+
+
+admission_controller = AdmissionController(
+    max_concurrent=config.ADMISSION_MAX_CONCURRENT,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+    client_rate=config.CLIENT_TOKENS_PER_SECOND,
+    client_burst=config.CLIENT_TOKEN_BURST,
+    persona_rate=config.PERSONA_TOKENS_PER_SECOND,
+    persona_burst=config.PERSONA_TOKEN_BURST,
+)
+
+
+def client_id_for(request) -> str:
+    # Works for both HTTP requests and WebSocket connections. The X-Client-Id header
+    # is only believed from a trusted proxy; anyone else could mint a fresh bucket per request
+    host = request.client.host if request.client else "unknown"
+    if host in config.TRUSTED_PROXIES:
+        return request.headers.get("x-client-id") or host
+    return host
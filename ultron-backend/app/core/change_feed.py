@@ -0,0 +1,79 @@
+# app/core/change_feed.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+from uuid import uuid4
+
+MAX_RETAINED_EVENTS = 1000
+
+
+class ChangeFeed:
+    """
+    In-process feed of chat/category changes with a monotonically increasing `seq`.
+    Writers call publish() from request handlers or worker threads; clients long-poll
+    /changes?since=<seq>&epoch=<epoch> instead of re-fetching lists on a timer.
+
+    `seq` starts over with every process, so each response carries the process's
+    `epoch`. A cursor from another epoch, or one ahead of `seq`, gets `reset: true`.
+    """
+
+    def __init__(self, max_events: int = MAX_RETAINED_EVENTS):
+        self._events = deque(maxlen=max_events)
+        self._seq = 0
+        self.epoch = uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._loop = None
+        self._changed = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._changed = asyncio.Event()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def publish(self, type: str, chat_id: str | None = None, category_id: str | None = None, **extra):
+        with self._lock:
+            self._seq += 1
+            self._events.append({
+                "seq": self._seq,
+                "type": type,
+                "chat_id": chat_id,
+                "category_id": category_id,
+                "at": time.time(),
+                **extra,
+            })
+        if self._loop is not None:
+            # Handlers declared with `def` run in a worker thread
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def since(self, seq: int, epoch: str | None = None) -> dict:
+        with self._lock:
+            oldest = self._events[0]["seq"] if self._events else self._seq + 1
+            # Events older than what we keep are gone, and a cursor from another process
+            # (or one ahead of us) says nothing about what the client has seen:
+            # the client has to refetch everything
+            if seq < oldest - 1 or seq > self._seq or (epoch is not None and epoch != self.epoch):
+                return {"seq": self._seq, "epoch": self.epoch, "reset": True, "events": []}
+            events = [e for e in self._events if e["seq"] > seq]
+            return {"seq": self._seq, "epoch": self.epoch, "reset": False, "events": events}
+
+    async def wait(self, seq: int, timeout: float, epoch: str | None = None) -> dict:
+        result = self.since(seq, epoch)
+        if result["events"] or result["reset"] or self._changed is None:
+            return result
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.since(seq, epoch)
+
+
+change_feed = ChangeFeed()
@@ -6,8 +6,72 @@ from pathlib import Path
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Browser origins allowed to call the API (CORS) and to open /ws/chat (comma separated)
+ALLOWED_ORIGINS = [o.strip() for o in os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",") if o.strip()]
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_API_KEY = os.getenv("SUPABASE_API_KEY")
 
-if not SUPABASE_URL or not SUPABASE_API_KEY:
-    raise EnvironmentError("SUPABASE_URL and SUPABASE_API_KEY must be set in .env or environment variables")
+
+def require_supabase_config():
+    # Only the Supabase sync needs these, so check them when it is used rather than at import.
+    if not SUPABASE_URL or not SUPABASE_API_KEY:
+        raise EnvironmentError("SUPABASE_URL and SUPABASE_API_KEY must be set in .env or environment variables")
+    return SUPABASE_URL, SUPABASE_API_KEY
+
+
+# Models loaded into Ollama in the background at startup (comma separated, empty disables warmup)
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "llama3:8b").split(",") if m.strip()]
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Admission control for the streaming endpoints (costs are in estimated tokens)
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+# Proxies whose X-Client-Id header names the real client (comma-separated addresses)
+TRUSTED_PROXIES = {p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()}
+CLIENT_TOKENS_PER_SECOND = float(os.getenv("CLIENT_TOKENS_PER_SECOND", "200"))
+CLIENT_TOKEN_BURST = float(os.getenv("CLIENT_TOKEN_BURST", "8000"))
+PERSONA_TOKENS_PER_SECOND = float(os.getenv("PERSONA_TOKENS_PER_SECOND", "800"))
+PERSONA_TOKEN_BURST = float(os.getenv("PERSONA_TOKEN_BURST", "16000"))
+
+# Offline batch jobs
+BATCH_DIR = Path(os.getenv("BATCH_DIR", str(Path(__file__).resolve().parent.parent / "batch_jobs")))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+
+# Cascade routing: simple requests go to a small model, see app/services/model_router.py.
+# Off by default: the small models have to be pulled into Ollama first
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "false").lower() in ("1", "true", "yes")
+SMALL_MODEL = os.getenv("SMALL_MODEL", "llama3.2:1b")
+SMALL_CODE_MODEL = os.getenv("SMALL_CODE_MODEL", "deepseek-coder:1.3b")
+
+# Conversation turns sent to the model with each message
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "20"))
+
+# WebSocket chat transport
+WS_MAX_STREAMS_PER_CONNECTION = int(os.getenv("WS_MAX_STREAMS_PER_CONNECTION", "4"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+
+# Streaming output: chunks are coalesced over a small time/byte window before each write
+STREAM_COALESCE_MS = float(os.getenv("STREAM_COALESCE_MS", "25"))
+STREAM_COALESCE_BYTES = int(os.getenv("STREAM_COALESCE_BYTES", "256"))
+STREAM_FLUSH_FIRST = os.getenv("STREAM_FLUSH_FIRST", "true").lower() in ("1", "true", "yes")
+STREAM_GZIP = os.getenv("STREAM_GZIP", "false").lower() in ("1", "true", "yes")
+
+# Retention: chats not updated for RETENTION_DAYS are archived to JSONL and purged (0 disables)
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "0"))
+RETENTION_MODE = os.getenv("RETENTION_MODE", "archive")  # "archive" or "delete"
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.2"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", str(Path(__file__).resolve().parent.parent / "archive")))
+VACUUM_PAGES = int(os.getenv("VACUUM_PAGES", "1000"))
+
+# Diagnostics: stage timings and stacks of slow requests, on-demand sampling profiles
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))  # 0 disables capture
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "100"))
+PROFILE_REQUESTS_ENABLED = os.getenv("PROFILE_REQUESTS_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_MS = float(os.getenv("PROFILE_SAMPLE_MS", "5"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # /admin and X-Profile stay disabled until this is set
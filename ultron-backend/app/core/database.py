@@ -1,6 +1,6 @@
 # app/core/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from fastapi import Depends
 from sqlalchemy.orm import Session
@@ -9,6 +9,16 @@ DATABASE_URL = "sqlite:///app/ultron_local.db"  # local file
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers keep going while the retention job writes; writers wait instead of failing
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 Base = declarative_base()
@@ -19,4 +29,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,62 @@
+# app/core/metrics.py
+
+# In-process metrics, exported in Prometheus text format at /metrics.
+# Counters only ever go up, gauges are set, summaries keep a count and a sum.
+
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_summaries = defaultdict(lambda: [0, 0.0])
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels):
+    with _lock:
+        summary = _summaries[_key(name, labels)]
+        summary[0] += 1
+        summary[1] += value
+
+
+def _format(name: str, labels: tuple, value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{k}="{str(v)}"' for k, v in labels)
+        return f"{name}{{{rendered}}} {value}"
+    return f"{name} {value}"
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(_format(name, labels, value))
+        for (name, labels), value in sorted(_gauges.items()):
+            lines.append(_format(name, labels, value))
+        for (name, labels), (count, total) in sorted(_summaries.items()):
+            lines.append(_format(f"{name}_count", labels, count))
+            lines.append(_format(f"{name}_sum", labels, total))
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": {f"{n}{dict(l)}": v for (n, l), v in _counters.items()},
+            "gauges": {f"{n}{dict(l)}": v for (n, l), v in _gauges.items()},
+            "summaries": {f"{n}{dict(l)}": {"count": c, "sum": s} for (n, l), (c, s) in _summaries.items()},
+        }
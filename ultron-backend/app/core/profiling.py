@@ -0,0 +1,217 @@
+# app/core/profiling.py
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from uuid import uuid4
+from weakref import WeakSet
+
+from app.core import config
+
+# ---- stage timings ----
+#
+# `with stage("name"):` records how long a block took on the current request's trace.
+# Without a trace (capture switched off) it costs one ContextVar lookup.
+
+current_trace = ContextVar("current_trace", default=None)
+
+
+class RequestTrace:
+    def __init__(self, method: str, path: str):
+        self.id = uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages = []
+        self.stack = None
+        self.status = None
+        self.route = None
+        # Tasks started while serving the request (see `track_request_tasks`) and the
+        # threads currently inside a stage, so a snapshot covers all of its work
+        self.tasks = WeakSet()
+        self.threads = {}
+
+    def add(self, name: str, seconds: float):
+        self.stages.append((name, round(seconds * 1000, 2)))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+class _Stage:
+    __slots__ = ("name", "trace", "started", "thread_id")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace = current_trace.get()
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.started = time.perf_counter()
+            self.thread_id = threading.get_ident()
+            self.trace.threads.setdefault(self.thread_id, self.name)
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter() - self.started)
+            if self.trace.threads.get(self.thread_id) == self.name:
+                del self.trace.threads[self.thread_id]
+        return False
+
+
+def stage(name: str) -> _Stage:
+    return _Stage(name)
+
+
+def record_stage(name: str, seconds: float):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+# ---- sampling profiler ----
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread (or only `thread_ids`) every `interval`
+    seconds from a background thread and aggregates them as collapsed stacks
+    ("root;child;leaf count"), the input format of flamegraph.pl and speedscope.
+
+    The event loop runs all requests on one thread, so a per-request profile also
+    contains whatever else the loop was doing at the time.
+    """
+
+    def __init__(self, interval: float, thread_ids: set | None = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+_process_profile_lock = asyncio.Lock()
+
+
+async def profile_process(seconds: float, interval: float) -> str | None:
+    """Profiles the whole process for `seconds`. Returns None if a profile is already running."""
+    if _process_profile_lock.locked():
+        return None
+    async with _process_profile_lock:
+        profiler = SamplingProfiler(interval).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(profiler.stop)
+        return profiler.collapsed()
+
+
+# ---- captured requests ----
+
+slow_requests = deque(maxlen=config.SLOW_REQUEST_BUFFER)
+request_profiles = OrderedDict()
+MAX_REQUEST_PROFILES = 20
+
+
+def store_request_profile(profile_id: str, collapsed: str):
+    request_profiles[profile_id] = collapsed
+    while len(request_profiles) > MAX_REQUEST_PROFILES:
+        request_profiles.popitem(last=False)
+
+
+def task_stack(task: asyncio.Task) -> list:
+    """Where a task's coroutine chain is suspended, outermost call first."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is not None:
+            frames.append(_frame_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "ag_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames
+
+
+def thread_stack(frame) -> list:
+    frames = []
+    while frame is not None:
+        frames.append(_frame_label(frame))
+        frame = frame.f_back
+    return frames[::-1]
+
+
+def snapshot_trace(trace: RequestTrace) -> list:
+    """
+    Stacks of everything still working on the request: its own task, the tasks it
+    spawned (the streaming body, stream pumps) and threads inside a `stage()`.
+    """
+    stacks = []
+    for task in list(trace.tasks):
+        if not task.done():
+            stacks.append({"task": task.get_name(), "stack": task_stack(task)})
+    loop_thread = threading.get_ident()
+    frames = sys._current_frames()
+    for thread_id, stage_name in list(trace.threads.items()):
+        # The loop thread is running this snapshot; its tasks are covered above
+        if thread_id != loop_thread and thread_id in frames:
+            stacks.append({"thread": stage_name, "stack": thread_stack(frames[thread_id])})
+    return stacks
+
+
+def track_request_tasks(loop: asyncio.AbstractEventLoop):
+    """
+    Installs a task factory that adds every task created under a trace to
+    `trace.tasks`. Idempotent; only installed once tracing is switched on.
+    """
+    previous = loop.get_task_factory()
+    if getattr(previous, "_tracks_requests", False):
+        return
+
+    def factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.tasks.add(task)
+        return task
+
+    factory._tracks_requests = True
+    loop.set_task_factory(factory)
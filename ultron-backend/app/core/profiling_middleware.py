@@ -0,0 +1,105 @@
+# app/core/profiling_middleware.py
+
+import asyncio
+import secrets
+import time
+
+from app.core import config, metrics
+from app.core.profiling import (
+    RequestTrace,
+    SamplingProfiler,
+    current_trace,
+    slow_requests,
+    snapshot_trace,
+    store_request_profile,
+    track_request_tasks,
+)
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI middleware, so the timing covers the whole streamed body.
+
+    - SLOW_REQUEST_MS > 0: every request gets a RequestTrace for `stage()` timings.
+      When a request is still running at the threshold, the stacks of its tasks and
+      stage threads are taken, and when it finishes over the threshold it is kept in
+      `slow_requests`.
+    - PROFILE_REQUESTS_ENABLED, ADMIN_TOKEN set and an `X-Profile: 1` header with a
+      matching X-Admin-Token: the request is sampled while it runs; the collapsed
+      stacks are stored under the X-Profile-Id header value.
+
+    With both off, requests pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (config.SLOW_REQUEST_MS > 0 or config.PROFILE_REQUESTS_ENABLED):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        profile = config.PROFILE_REQUESTS_ENABLED and headers.get(b"x-profile") == b"1" and _authorized(headers)
+        if config.SLOW_REQUEST_MS <= 0 and not profile:
+            return await self.app(scope, receive, send)
+
+        trace = RequestTrace(scope.get("method", ""), scope.get("path", ""))
+        token = current_trace.set(trace)
+        loop = asyncio.get_running_loop()
+        track_request_tasks(loop)
+        trace.tasks.add(asyncio.current_task())
+        timer = None
+        if config.SLOW_REQUEST_MS > 0:
+            timer = loop.call_later(config.SLOW_REQUEST_MS / 1000, _snapshot, trace)
+        profiler = SamplingProfiler(config.PROFILE_SAMPLE_MS / 1000).start() if profile else None
+        first_byte = None
+
+        async def traced_send(message):
+            nonlocal first_byte
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                if profiler is not None:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", trace.id.encode())]
+            elif message["type"] == "http.response.body" and first_byte is None:
+                first_byte = time.perf_counter()
+                trace.add("time_to_first_byte", first_byte - trace.started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            current_trace.reset(token)
+            if timer is not None:
+                timer.cancel()
+            if profiler is not None:
+                await asyncio.to_thread(profiler.stop)
+                store_request_profile(trace.id, profiler.collapsed())
+
+            elapsed = trace.elapsed_ms()
+            if config.SLOW_REQUEST_MS > 0 and elapsed >= config.SLOW_REQUEST_MS:
+                # The route template ("/chats/{chat_id}/messages") keeps the label set bounded
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                metrics.inc("ultron_slow_requests_total", route=route)
+                slow_requests.append({
+                    "id": trace.id,
+                    "method": trace.method,
+                    "path": trace.path,
+                    "route": route,
+                    "status": trace.status,
+                    "duration_ms": round(elapsed, 1),
+                    "stages": trace.stages,
+                    "stack": trace.stack,
+                    "profile_id": trace.id if profiler is not None else None,
+                    "at": time.time(),
+                })
+
+
+def _snapshot(trace: RequestTrace):
+    trace.stack = snapshot_trace(trace)
+
+
+def _authorized(headers: dict) -> bool:
+    # Per-request profiling is only available with an admin token configured
+    if not config.ADMIN_TOKEN:
+        return False
+    return secrets.compare_digest(headers.get(b"x-admin-token", b""), config.ADMIN_TOKEN.encode())
@@ -0,0 +1,109 @@
+# app/core/startup.py
+
+import asyncio
+import time
+
+from sqlalchemy import inspect, text
+
+from app.core.change_feed import change_feed
+from app.core.database import Base, engine
+
+# Columns added after the first release. create_all() never alters existing tables,
+# so each entry is applied with ALTER TABLE when the column is missing.
+# (table, column, column DDL)
+SCHEMA_MIGRATIONS = [
+    ("messages", "status", "VARCHAR DEFAULT 'complete'"),
+    ("chats", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("chats", "updated_at", "DATETIME"),
+    ("categories", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("categories", "updated_at", "DATETIME"),
+]
+
+# Run after the migrations on every start; each one is a no-op once applied
+SCHEMA_STATEMENTS = [
+    "UPDATE chats SET updated_at = created_at WHERE updated_at IS NULL",
+    "UPDATE categories SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_messages_chat_timestamp ON messages (chat_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_chats_category_updated ON chats (category_id, updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_chats_updated ON chats (updated_at)",
+]
+
+startup_state = {
+    "started_at": None,
+    "database": "pending",
+    "models": {},
+    "warmup_done": False,
+}
+
+
+def init_database():
+    # Import the models so they are registered on Base before create_all()
+    from app.models import db_models  # noqa: F401
+
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    apply_schema_migrations()
+    startup_state["database"] = "ready"
+    print(f"✅ Tables ready in {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+
+def apply_schema_migrations():
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl in SCHEMA_MIGRATIONS:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                print(f"🛠️ Added column {table}.{column}")
+        for statement in SCHEMA_STATEMENTS:
+            conn.execute(text(statement))
+
+
+async def warm_models(models, keep_alive):
+    # An empty prompt makes Ollama load the model into memory without generating anything.
+    import ollama
+
+    client = ollama.AsyncClient()
+    for model in models:
+        startup_state["models"][model] = "loading"
+        started = time.perf_counter()
+        try:
+            await client.generate(model=model, prompt="", keep_alive=keep_alive)
+            startup_state["models"][model] = "ready"
+            print(f"🔥 Warmed {model} in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            startup_state["models"][model] = "failed"
+            print(f"[WARN] Could not warm {model}: {e}")
+    startup_state["warmup_done"] = True
+
+
+def is_ready() -> bool:
+    return startup_state["database"] == "ready" and startup_state["warmup_done"]
+
+
+async def run_startup(app):
+    from app.core.config import WARMUP_MODELS, OLLAMA_KEEP_ALIVE, ROUTING_ENABLED, SMALL_MODEL, SMALL_CODE_MODEL
+    from app.services.batch_service import batch_runner
+    from app.services.chat_maintenance import retention_loop
+
+    warmup = list(WARMUP_MODELS)
+    if ROUTING_ENABLED and WARMUP_MODELS:
+        warmup += [m for m in (SMALL_MODEL, SMALL_CODE_MODEL) if m not in warmup]
+
+    startup_state["started_at"] = time.time()
+    change_feed.bind(asyncio.get_running_loop())
+    await asyncio.to_thread(init_database)
+    batch_runner.resume_pending()
+    app.state.background_tasks = [
+        asyncio.create_task(warm_models(warmup, OLLAMA_KEEP_ALIVE)),
+        asyncio.create_task(retention_loop()),
+    ]
+
+
+async def run_shutdown(app):
+    from app.services.batch_service import batch_runner
+
+    await batch_runner.shutdown()
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
+    await asyncio.gather(*getattr(app.state, "background_tasks", []), return_exceptions=True)
@@ -0,0 +1,132 @@
+# app/core/streams.py
+
+import asyncio
+import time
+from uuid import uuid4
+
+from app.core import metrics
+from app.core.profiling import record_stage
+
+DISCONNECT_POLL_SECONDS = 0.5
+
+_END = object()
+_CANCELLED = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ActiveStream:
+    """
+    One in-flight generation. The upstream chunks are pumped by a separate task so
+    that cancelling it (client disconnect, stop button, /streams/{id}/cancel) aborts
+    the Ollama HTTP stream right away instead of after the next token.
+    """
+
+    def __init__(self, persona: str, chat_id: str | None, max_tokens: int):
+        self.id = uuid4().hex
+        self.persona = persona
+        self.chat_id = chat_id
+        self.max_tokens = max_tokens
+        self.tokens = 0
+        self.started_at = time.time()
+        self.cancel_reason = None
+        self._queue = asyncio.Queue()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+    def cancel(self, reason: str = "client"):
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+            self._queue.put_nowait(_CANCELLED)
+
+    async def iterate(self, source, is_disconnected=None):
+        """Yield chunks from `source` until it ends or the stream is cancelled."""
+        producer = asyncio.create_task(self._pump(source))
+        watcher = asyncio.create_task(self._watch(is_disconnected)) if is_disconnected else None
+        started = time.perf_counter()
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _END or item is _CANCELLED:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                if self.tokens == 0:
+                    record_stage("ollama_first_token", time.perf_counter() - started)
+                self.tokens += 1
+                yield item
+        finally:
+            record_stage("ollama_stream", time.perf_counter() - started)
+            tasks = [t for t in (producer, watcher) if t is not None]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _pump(self, source):
+        try:
+            async for chunk in source:
+                self._queue.put_nowait(chunk)
+            self._queue.put_nowait(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._queue.put_nowait(_Failure(e))
+        finally:
+            # Closing the generator closes the upstream HTTP response
+            await source.aclose()
+
+    async def _watch(self, is_disconnected):
+        while not self.cancelled:
+            if await is_disconnected():
+                self.cancel("disconnected")
+                return
+            await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+    def record_cancellation(self):
+        reason = self.cancel_reason or "disconnected"
+        metrics.inc("ultron_stream_cancelled_total", persona=self.persona, reason=reason)
+        # Tokens the model would still have been allowed to generate for nobody
+        metrics.inc("ultron_stream_tokens_saved_total", max(0, self.max_tokens - self.tokens), persona=self.persona)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "persona": self.persona,
+            "chat_id": self.chat_id,
+            "tokens": self.tokens,
+            "started_at": self.started_at,
+            "cancelled": self.cancelled,
+        }
+
+
+class StreamRegistry:
+    def __init__(self):
+        self._streams = {}
+
+    def open(self, persona: str, chat_id: str | None, max_tokens: int) -> ActiveStream:
+        stream = ActiveStream(persona, chat_id, max_tokens)
+        self._streams[stream.id] = stream
+        return stream
+
+    def close(self, stream: ActiveStream):
+        self._streams.pop(stream.id, None)
+
+    def get(self, stream_id: str) -> ActiveStream | None:
+        return self._streams.get(stream_id)
+
+    def cancel(self, stream_id: str, reason: str = "client") -> ActiveStream | None:
+        stream = self._streams.get(stream_id)
+        if stream is not None:
+            stream.cancel(reason)
+        return stream
+
+    def active(self) -> list:
+        return [s.to_dict() for s in self._streams.values()]
+
+
+stream_registry = StreamRegistry()
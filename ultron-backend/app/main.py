@@ -1,26 +1,45 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.chat import router as chat_router
+from app.api.system import router as system_router
+from app.api.batch import router as batch_router
+from app.api.chat_ws import router as chat_ws_router
+from app.api.admin import router as admin_router
 from app import upload
-from app.core.database import Base, engine
+from app.core.config import ALLOWED_ORIGINS
+from app.core.startup import run_startup, run_shutdown
+from app.core.profiling_middleware import ProfilingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema checks and model warmup run here instead of at import time
+    await run_startup(app)
+    yield
+    await run_shutdown(app)
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS config
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:5173"],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stream-Id", "X-Model", "Retry-After", "ETag", "X-Watermark", "X-Profile-Id"],
 )
 
-def create_all_tables():
-    Base.metadata.create_all(bind=engine)
-    print("✅ Tables created successfully.")
-    
-create_all_tables()
+# Stage timings, slow-request capture and per-request profiles (off unless configured)
+app.add_middleware(ProfilingMiddleware)
 
 # Include routes
 app.include_router(chat_router)
 app.include_router(upload.router)
+app.include_router(system_router)
+app.include_router(batch_router)
+app.include_router(chat_ws_router)
+app.include_router(admin_router)
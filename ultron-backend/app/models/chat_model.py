@@ -1,5 +1,5 @@
 # app/models/chat_model.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 from datetime import datetime
 
@@ -26,9 +26,13 @@ class ChatSummary(BaseModel):
     created_at: datetime
     category: Optional[str]
     last_message: Optional[str] = ""
+    updated_at: Optional[datetime] = None
+    version: Optional[int] = None
 
 class ChatListResponse(BaseModel):
     chats: List[ChatSummary]
+    # Newest updated_at in the list; pass it back as ?since= to get only later changes
+    watermark: Optional[datetime] = None
 # class ChatMessage(BaseModel):
 #     id: str
 #     category_id: str
@@ -83,3 +87,16 @@ class ChatCreateRequest(BaseModel):
     category_id: str
 
 
+class BulkChatFilter(BaseModel):
+    # At least one of these must be given; they are combined with AND
+    ids: Optional[List[str]] = None
+    category: Optional[str] = None  # category name/slug
+    older_than_days: Optional[float] = Field(default=None, gt=0)
+
+
+class BulkMoveRequest(BulkChatFilter):
+    target_category: str
+
+
+class BulkChatResponse(BaseModel):
+    affected: int
@@ -2,7 +2,7 @@
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, String, ForeignKey, DateTime, Text, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -13,6 +13,9 @@ class Category(Base):
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String, unique=True, nullable=False)
+    # Bumped whenever a chat in this category is created, renamed, deleted or gets a message
+    version = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
     chats = relationship("Chat", back_populates="category")
     messages = relationship("Message", back_populates="category")
@@ -25,6 +28,9 @@ class Chat(Base):
     chat_name = Column(String, nullable=False)
     category_id = Column(String, ForeignKey("categories.id"))
     created_at = Column(DateTime, default=datetime.utcnow) 
+    # Bumped on every write to the chat or its messages (ETags and ?since= use these)
+    version = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
     messages = relationship('Message', back_populates='chat', cascade='all, delete-orphan')
     category = relationship("Category", back_populates="chats")
@@ -39,6 +45,7 @@ class Message(Base):
     role = Column(String, nullable=False)  # "user" or "assistant"
     message = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    status = Column(String, default="complete")  # "complete" or "cancelled"
 
     category = relationship("Category", back_populates="messages")
     chat = relationship("Chat", back_populates="messages")
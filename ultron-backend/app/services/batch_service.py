@@ -0,0 +1,338 @@
+# app/services/batch_service.py
+
+import asyncio
+import json
+import time
+from itertools import groupby
+from uuid import uuid4
+
+from app.core import config, metrics
+from app.core.admission import admission_controller
+from app.core.personas import PERSONAS, get_persona
+from app.utils.ollama_client import get_async_client
+
+# Job directory layout (one folder per job under BATCH_DIR):
+#   job.json       metadata and counters, rewritten on every checkpoint
+#   input.jsonl    normalized prompts, one per line with their index
+#   results.jsonl  append-only results; the last line for an index wins. Indices that
+#                  succeeded are skipped on resume, failed ones are retried until
+#                  they have used BATCH_MAX_ATTEMPTS attempts
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+CHECKPOINT_EVERY = 10
+
+
+class BatchInputError(ValueError):
+    pass
+
+
+def parse_batch_input(content: bytes, persona: str, model: str | None) -> list:
+    if persona not in PERSONAS:
+        raise BatchInputError(f"Unknown persona: {persona}")
+
+    try:
+        text = content.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise BatchInputError(f"The file is not valid UTF-8: {e}")
+
+    items = []
+    for line_no, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BatchInputError(f"Line {line_no} is not valid JSON: {e}")
+        if isinstance(row, str):
+            row = {"prompt": row}
+        if not isinstance(row, dict) or not str(row.get("prompt", "")).strip():
+            raise BatchInputError(f"Line {line_no} needs a non-empty 'prompt'")
+
+        item_persona = row.get("persona", persona)
+        if item_persona not in PERSONAS:
+            raise BatchInputError(f"Line {line_no}: unknown persona {item_persona}")
+        persona_config = get_persona(item_persona)
+        items.append({
+            "index": len(items),
+            "id": str(row.get("id", len(items))),
+            "prompt": row["prompt"],
+            "persona": item_persona,
+            "model": row.get("model") or model or persona_config["model"],
+        })
+
+    if not items:
+        raise BatchInputError("The file contains no prompts")
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise BatchInputError(f"At most {config.BATCH_MAX_ITEMS} prompts per job")
+    return items
+
+
+class BatchRunner:
+    """
+    Runs batch jobs one at a time from a FIFO queue. Inside a job the prompts are
+    grouped by model and each group runs with BATCH_CONCURRENCY requests in flight,
+    so Ollama loads each model once instead of swapping between them.
+    """
+
+    def __init__(self, root, concurrency: int):
+        self.root = root
+        self.concurrency = concurrency
+        self.jobs = {}
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self._current_cancel = None
+
+    # ---- storage ----
+
+    def _job_dir(self, job_id: str):
+        return self.root / job_id
+
+    def results_path(self, job_id: str):
+        return self._job_dir(job_id) / "results.jsonl"
+
+    def _save_job(self, job: dict):
+        path = self._job_dir(job["id"]) / "job.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(job, indent=2))
+        tmp.replace(path)
+
+    def _load_items(self, job_id: str) -> list:
+        with open(self._job_dir(job_id) / "input.jsonl", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _scan_results(self, job_id: str) -> tuple:
+        """
+        Indices that are finished, failed indices to retry (with their attempt counts),
+        and the completed/failed/token counters rebuilt from the results file.
+        """
+        path = self.results_path(job_id)
+        latest = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                        latest[result["index"]] = result
+                    except (json.JSONDecodeError, KeyError):
+                        # A torn last line from a crash is simply redone
+                        continue
+
+        done, retry, failed, tokens = set(), {}, 0, 0
+        for index, result in latest.items():
+            if result.get("error"):
+                failed += 1
+                attempts = result.get("attempts", 1)
+                if attempts < config.BATCH_MAX_ATTEMPTS:
+                    retry[index] = attempts
+                    continue
+            else:
+                tokens += result.get("eval_tokens", 0)
+            done.add(index)
+        return done, retry, len(latest) - failed, failed, tokens
+
+    # ---- lifecycle ----
+
+    def create_job(self, content: bytes, persona: str, model: str | None = None) -> dict:
+        items = parse_batch_input(content, persona, model)
+        job_id = uuid4().hex
+        job_dir = self._job_dir(job_id)
+        job_dir.mkdir(parents=True)
+        with open(job_dir / "input.jsonl", "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "persona": persona,
+            "models": sorted({item["model"] for item in items}),
+            "total": len(items),
+            "completed": 0,
+            "failed": 0,
+            "eval_tokens": 0,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "run_seconds": 0.0,
+            "error": None,
+        }
+        self._save_job(job)
+        self.jobs[job_id] = job
+        self._queue.put_nowait(job_id)
+        self._ensure_worker()
+        return job
+
+    def resume_pending(self):
+        """Reload jobs from disk after a restart and requeue the unfinished ones."""
+        if not self.root.exists():
+            return
+        pending = []
+        for job_file in self.root.glob("*/job.json"):
+            job = json.loads(job_file.read_text())
+            self.jobs[job["id"]] = job
+            if job["status"] not in TERMINAL_STATUSES:
+                job["status"] = "queued"
+                pending.append(job)
+        for job in sorted(pending, key=lambda j: j["created_at"]):
+            print(f"🔁 Resuming batch job {job['id']} ({job['completed'] + job['failed']}/{job['total']} done)")
+            self._queue.put_nowait(job["id"])
+        if pending:
+            self._ensure_worker()
+
+    def cancel_job(self, job_id: str) -> dict | None:
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return job
+        job["status"] = "cancelled"
+        job["finished_at"] = time.time()
+        self._save_job(job)
+        if self._current_cancel and self._current_cancel[0] == job_id:
+            self._current_cancel[1].set()
+        return job
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+
+    async def shutdown(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                continue
+            try:
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                # Server shutdown: leave the job resumable
+                job["status"] = "queued"
+                self._save_job(job)
+                raise
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                job["finished_at"] = time.time()
+                self._save_job(job)
+                print(f"[ERROR] Batch job {job_id} failed: {e}")
+
+    # ---- execution ----
+
+    async def _run_job(self, job: dict):
+        # results.jsonl is the checkpoint; job.json counters may lag behind it after a crash
+        done, retry, completed, failed, tokens = self._scan_results(job["id"])
+        job["completed"], job["failed"], job["eval_tokens"] = completed, failed, tokens
+        pending = [item for item in self._load_items(job["id"]) if item["index"] not in done]
+
+        job["status"] = "running"
+        job["started_at"] = job["started_at"] or time.time()
+        self._save_job(job)
+        cancel_event = asyncio.Event()
+        self._current_cancel = (job["id"], cancel_event)
+        run_started = time.perf_counter()
+        run_seconds_before = job["run_seconds"]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = open(self.results_path(job["id"]), "a+", encoding="utf-8")
+        if results.tell() > 0:
+            # Terminate a line torn by a crash so the next result starts on its own line
+            results.seek(results.tell() - 1)
+            if results.read(1) != "\n":
+                results.write("\n")
+        finished_since_checkpoint = 0
+
+        async def run_item(item):
+            nonlocal finished_since_checkpoint
+            async with semaphore:
+                if cancel_event.is_set():
+                    return
+                # Batch items count against the same generation slots as interactive chats
+                ticket = await admission_controller.acquire_background(item["persona"])
+                try:
+                    result = await self._generate(item)
+                finally:
+                    admission_controller.release(ticket)
+            if result.get("error"):
+                result["attempts"] = retry.get(item["index"], 0) + 1
+            results.write(json.dumps(result) + "\n")
+            results.flush()
+
+            if item["index"] in retry:
+                # Counted as failed by the scan; this attempt replaces that outcome
+                job["failed"] -= 1
+            if result.get("error"):
+                job["failed"] += 1
+            else:
+                job["completed"] += 1
+                job["eval_tokens"] += result.get("eval_tokens", 0)
+            metrics.inc("ultron_batch_items_total", model=item["model"], outcome="error" if result.get("error") else "ok")
+
+            job["run_seconds"] = run_seconds_before + time.perf_counter() - run_started
+            finished_since_checkpoint += 1
+            if finished_since_checkpoint >= CHECKPOINT_EVERY:
+                finished_since_checkpoint = 0
+                self._save_job(job)
+
+        try:
+            # Finish every prompt for one model before loading the next
+            pending.sort(key=lambda item: item["model"])
+            for model, group in groupby(pending, key=lambda item: item["model"]):
+                if cancel_event.is_set():
+                    break
+                print(f"📦 Batch {job['id']}: running model {model}")
+                await asyncio.gather(*(run_item(item) for item in group))
+        finally:
+            results.close()
+            self._current_cancel = None
+            job["run_seconds"] = run_seconds_before + time.perf_counter() - run_started
+
+        if job["status"] == "running":
+            job["status"] = "completed"
+            job["finished_at"] = time.time()
+        self._save_job(job)
+
+    async def _generate(self, item: dict) -> dict:
+        persona_config = get_persona(item["persona"])
+        started = time.perf_counter()
+        try:
+            response = await get_async_client().chat(
+                model=item["model"],
+                messages=[
+                    {"role": "system", "content": persona_config["system_prompt"]},
+                    {"role": "user", "content": item["prompt"]},
+                ],
+                options={"num_predict": persona_config["max_tokens"]},
+                keep_alive=config.OLLAMA_KEEP_ALIVE,
+            )
+        except Exception as e:
+            return {"index": item["index"], "id": item["id"], "model": item["model"], "error": str(e)}
+
+        return {
+            "index": item["index"],
+            "id": item["id"],
+            "model": item["model"],
+            "response": response["message"]["content"],
+            "eval_tokens": response.get("eval_count") or 0,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    # ---- reporting ----
+
+    def status(self, job_id: str) -> dict | None:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        finished = job["completed"] + job["failed"]
+        seconds = job["run_seconds"]
+        return {
+            **job,
+            "progress": round(finished / job["total"], 4) if job["total"] else 1.0,
+            "items_per_second": round(finished / seconds, 3) if seconds else None,
+            "tokens_per_second": round(job["eval_tokens"] / seconds, 1) if seconds else None,
+        }
+
+
+batch_runner = BatchRunner(config.BATCH_DIR, config.BATCH_CONCURRENCY)
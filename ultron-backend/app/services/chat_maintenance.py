@@ -0,0 +1,213 @@
+# app/services/chat_maintenance.py
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, text, update
+
+from app.core import config, metrics
+from app.core.change_feed import change_feed
+from app.core.database import SessionLocal, engine
+from app.models.db_models import Category, Chat, Message
+
+# Bulk operations work on sets of chats with a handful of UPDATE/DELETE statements
+# instead of loading chats and their messages through the ORM.
+
+
+def chat_filter(ids: list | None = None, category_id: str | None = None, older_than: datetime | None = None):
+    conditions = []
+    if ids is not None:
+        conditions.append(Chat.id.in_(ids))
+    if category_id is not None:
+        conditions.append(Chat.category_id == category_id)
+    if older_than is not None:
+        conditions.append(Chat.updated_at < older_than)
+    if not conditions:
+        raise ValueError("Refusing to touch every chat: pass ids, a category or an age")
+    return conditions
+
+
+def _touch_categories(db, category_ids, now: datetime):
+    db.execute(
+        update(Category)
+        .where(Category.id.in_(category_ids))
+        .values(version=Category.version + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bulk_delete_chats(db, **filters) -> int:
+    conditions = chat_filter(**filters)
+    chat_ids = select(Chat.id).where(*conditions)
+    category_ids = [row[0] for row in db.execute(select(Chat.category_id).where(*conditions).distinct())]
+
+    db.execute(delete(Message).where(Message.chat_id.in_(chat_ids)).execution_options(synchronize_session=False))
+    deleted = db.execute(delete(Chat).where(*conditions).execution_options(synchronize_session=False)).rowcount
+    _touch_categories(db, category_ids, datetime.utcnow())
+    db.commit()
+
+    if deleted:
+        change_feed.publish("chats.bulk_deleted", count=deleted, category_ids=category_ids)
+    return deleted
+
+
+def bulk_move_chats(db, target_category_id: str, **filters) -> int:
+    conditions = chat_filter(**filters)
+    now = datetime.utcnow()
+    chat_ids = select(Chat.id).where(*conditions)
+    category_ids = [row[0] for row in db.execute(select(Chat.category_id).where(*conditions).distinct())]
+
+    # Messages first, while the filter still matches the chats' old category
+    db.execute(
+        update(Message)
+        .where(Message.chat_id.in_(chat_ids))
+        .values(category_id=target_category_id)
+        .execution_options(synchronize_session=False)
+    )
+    moved = db.execute(
+        update(Chat)
+        .where(*conditions)
+        .values(category_id=target_category_id, version=Chat.version + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    _touch_categories(db, set(category_ids) | {target_category_id}, now)
+    db.commit()
+
+    if moved:
+        change_feed.publish("chats.bulk_moved", count=moved, category_ids=category_ids, target_category_id=target_category_id)
+    return moved
+
+
+# ---- retention ----
+
+retention_state = {"last_run": None, "running": False}
+
+
+def _archive_batch(db, chat_ids: list):
+    # One JSON line per chat with its messages, appended to a file per day
+    config.ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    path = config.ARCHIVE_DIR / f"chats-{datetime.utcnow():%Y%m%d}.jsonl"
+    chats = db.execute(select(Chat).where(Chat.id.in_(chat_ids))).scalars().all()
+    messages = db.execute(
+        select(Message).where(Message.chat_id.in_(chat_ids)).order_by(Message.chat_id, Message.timestamp)
+    ).scalars().all()
+    by_chat = {}
+    for m in messages:
+        by_chat.setdefault(m.chat_id, []).append({
+            "id": m.id,
+            "role": m.role,
+            "message": m.message,
+            "timestamp": m.timestamp.isoformat() if m.timestamp else None,
+            "status": m.status,
+        })
+    with open(path, "a", encoding="utf-8") as f:
+        for chat in chats:
+            f.write(json.dumps({
+                "id": chat.id,
+                "chat_name": chat.chat_name,
+                "category_id": chat.category_id,
+                "created_at": chat.created_at.isoformat() if chat.created_at else None,
+                "updated_at": chat.updated_at.isoformat() if chat.updated_at else None,
+                "messages": by_chat.get(chat.id, []),
+            }) + "\n")
+
+
+def purge_batch(cutoff: datetime, batch_size: int, mode: str) -> int:
+    """Archives (optionally) and deletes up to `batch_size` chats in one short transaction."""
+    db = SessionLocal()
+    try:
+        chat_ids = [
+            row[0]
+            for row in db.execute(
+                select(Chat.id).where(Chat.updated_at < cutoff).order_by(Chat.updated_at).limit(batch_size)
+            )
+        ]
+        if not chat_ids:
+            return 0
+        if mode == "archive":
+            _archive_batch(db, chat_ids)
+        return bulk_delete_chats(db, ids=chat_ids)
+    finally:
+        db.close()
+
+
+def ensure_incremental_vacuum():
+    # auto_vacuum can only be switched on by rebuilding the file once with VACUUM
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+        if mode != 2:
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+            print("🧹 Enabled incremental auto_vacuum on the SQLite database.")
+
+
+def vacuum_and_analyze(pages: int):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        freelist = conn.execute(text("PRAGMA freelist_count")).scalar()
+        # Returns free pages to the OS a few at a time instead of a full VACUUM. sqlite3's
+        # execute() steps the pragma once (one page); executescript() runs it to completion
+        conn.connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        # Re-runs ANALYZE only for tables whose statistics are out of date
+        conn.execute(text("PRAGMA optimize"))
+    return freelist
+
+
+def run_retention(days: float, mode: str, batch_size: int, pause: float, vacuum_pages: int) -> dict:
+    started = time.perf_counter()
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    purged = 0
+    # With retention off (days <= 0) the run only vacuums and refreshes statistics
+    while days > 0:
+        count = purge_batch(cutoff, batch_size, mode)
+        purged += count
+        if count < batch_size:
+            break
+        # Let other writers in between batches
+        time.sleep(pause)
+
+    free_pages = vacuum_and_analyze(vacuum_pages)
+    result = {
+        "finished_at": time.time(),
+        "cutoff": cutoff.isoformat(),
+        "mode": mode,
+        "purged_chats": purged,
+        "free_pages_before_vacuum": free_pages,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    metrics.inc("ultron_retention_purged_chats_total", purged, mode=mode)
+    print(f"🧹 Retention: {purged} chats older than {days:g} days {mode}d in {result['seconds']}s")
+    return result
+
+
+async def run_retention_now(enable_incremental_vacuum: bool = False) -> dict:
+    if retention_state["running"]:
+        return retention_state["last_run"] or {}
+    retention_state["running"] = True
+    try:
+        if enable_incremental_vacuum:
+            # A no-op once enabled; the first time it rebuilds the file with a full VACUUM
+            await asyncio.to_thread(ensure_incremental_vacuum)
+        result = await asyncio.to_thread(
+            run_retention,
+            config.RETENTION_DAYS,
+            config.RETENTION_MODE,
+            config.RETENTION_BATCH_SIZE,
+            config.RETENTION_BATCH_PAUSE,
+            config.VACUUM_PAGES,
+        )
+        retention_state["last_run"] = result
+        return result
+    finally:
+        retention_state["running"] = False
+
+
+async def retention_loop():
+    while True:
+        try:
+            # Only a database that actually purges rows needs its file rebuilt for auto_vacuum
+            await run_retention_now(enable_incremental_vacuum=config.RETENTION_DAYS > 0)
+        except Exception as e:
+            print(f"[ERROR] Retention run failed: {e}")
+        await asyncio.sleep(config.RETENTION_INTERVAL_SECONDS)
@@ -1,29 +1,43 @@
 # app/services/chat_service.py
 
 from typing import AsyncGenerator, List, Optional
-from app.utils.ollama_client import query_ollama_model
-from app.utils.file_parser import parse_file
 from app.models.chat_model import ChatRequest
-import os, ollama
+from app.utils.ollama_client import get_async_client
 
-async def process_chat(message: str, history: list, model: str = "mistral", system_prompt: str | None = None):
+async def process_chat(message: str, history: list, model: str = "mistral", system_prompt: str | None = None, max_tokens: int | None = None, usage: dict | None = None):
     # Set default system prompt if not provided
     prompt = system_prompt or (
         "You are Ultron AI 🤖, a helpful assistant. Always respond clearly, with bullet points where needed."
     )
 
     async def stream():
-        response = ollama.chat(
+        response = await get_async_client().chat(
             model=model,
             messages=[
                 {"role": "system", "content": prompt},
+                *[
+                    {"role": turn["role"], "content": turn["content"]}
+                    for turn in history
+                    if turn.get("role") in ("user", "assistant") and turn.get("content")
+                ],
                 {"role": "user", "content": message}
             ],
-            stream=True
+            stream=True,
+            options={"num_predict": max_tokens} if max_tokens else None,
         )
 
-        for chunk in response:
-            content = chunk["message"]["content"]
-            yield content
+        try:
+            async for chunk in response:
+                if chunk.get("done") and usage is not None:
+                    # The last chunk carries Ollama's token counts and timings
+                    usage.update(
+                        prompt_tokens=chunk.get("prompt_eval_count"),
+                        completion_tokens=chunk.get("eval_count"),
+                        total_duration_ms=round((chunk.get("total_duration") or 0) / 1e6, 1),
+                    )
+                content = chunk["message"]["content"]
+                yield content
+        finally:
+            await response.aclose()
 
     return stream
@@ -1,12 +1,38 @@
 from app.models.db_models import Message, Category, Chat
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
+from app.core.change_feed import change_feed
+from app.core.profiling import stage
 from uuid import uuid4
 from datetime import datetime
 
 chat_tracker = {}
 
-async def save_message_locally(chat_id: str, role: str, message: str):
+
+def touch_chat(db: Session, chat: Chat, now: datetime | None = None):
+    # Moves the chat's and its category's watermarks so cached lists and ETags go stale
+    now = now or datetime.utcnow()
+    chat.version = (chat.version or 0) + 1
+    chat.updated_at = now
+    touch_category(db, chat.category_id, now)
+
+
+def touch_category(db: Session, category_id: str | None, now: datetime | None = None):
+    if not category_id:
+        return
+    db.query(Category).filter(Category.id == category_id).update(
+        {Category.version: Category.version + 1, Category.updated_at: now or datetime.utcnow()},
+        synchronize_session=False,
+    )
+
+
+async def save_message_locally(chat_id: str, role: str, message: str, status: str = "complete"):
+    with stage("save_message_locally"):
+        _save_message(chat_id, role, message, status)
+
+
+def _save_message(chat_id: str, role: str, message: str, status: str):
     db = SessionLocal()
     try:
         chat = db.query(Chat).filter(Chat.id == chat_id).first()
@@ -19,16 +45,34 @@ async def save_message_locally(chat_id: str, role: str, message: str):
             chat_id=chat.id,
             role=role,
             message=message,
-            timestamp=datetime.utcnow()
+            timestamp=datetime.utcnow(),
+            status=status,
         )
         db.add(msg)
+        touch_chat(db, chat, msg.timestamp)
         db.commit()
+        change_feed.publish("message.created", chat_id=chat.id, category_id=chat.category_id, message_id=msg.id)
 
     finally:
         db.close()
 
 
 
+async def load_chat_history(chat_id: str, limit: int) -> list:
+    # The last `limit` finished turns, oldest first, in the shape the model expects
+    db = SessionLocal()
+    try:
+        messages = (
+            db.query(Message)
+            .filter(Message.chat_id == chat_id, or_(Message.status.is_(None), Message.status != "cancelled"))
+            .order_by(Message.timestamp.desc())
+            .limit(limit)
+            .all()
+        )
+        return [{"role": m.role, "content": m.message} for m in reversed(messages)]
+    finally:
+        db.close()
+
 
 def get_category_id_by_name(db: Session, name: str) -> int:
     category = db.query(Category).filter_by(name=name).first()
@@ -0,0 +1,71 @@
+# app/services/model_router.py
+
+import re
+from dataclasses import dataclass
+
+from app.core import config, metrics
+
+# Cheap signals that a request needs the full-size model
+CODE_PATTERN = re.compile(
+    r"```|^\s*(def|class|import|from|public|function|const|let|var|#include)\b|=>|;\s*$|\bSELECT\b.+\bFROM\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+COMPLEX_PATTERN = re.compile(
+    r"\b(explain|why|compare|analy[sz]e|step[- ]by[- ]step|in detail|detailed|essay|implement|debug|"
+    r"optimi[sz]e|prove|derive|design|architecture|pros and cons|summari[sz]e)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    max_tokens: int
+    tier: str  # "small" or "large"
+    reason: str
+
+
+def classify(message: str, history: list, filenames: list, routing: dict) -> str | None:
+    """Returns why the request must be escalated to the large model, or None if it is simple."""
+    if filenames:
+        return "attachments"
+    if len(message) > routing["max_simple_chars"]:
+        return "long_message"
+    if len(history or []) > routing["max_history_turns"]:
+        return "long_history"
+    if not routing["allow_code"] and CODE_PATTERN.search(message):
+        return "code"
+    if COMPLEX_PATTERN.search(message):
+        return "complex_intent"
+    return None
+
+
+def route_request(persona: str, persona_config: dict, message: str, history: list, filenames: list) -> RouteDecision:
+    routing = persona_config.get("routing")
+    large = RouteDecision(persona_config["model"], persona_config["max_tokens"], "large", "")
+
+    if not config.ROUTING_ENABLED:
+        large.reason = "routing_disabled"
+    elif not routing:
+        large.reason = "persona_not_routed"
+    else:
+        escalation = classify(message, history, filenames or [], routing)
+        if escalation:
+            large.reason = escalation
+        else:
+            decision = RouteDecision(routing["small_model"], routing["small_max_tokens"], "small", "simple")
+            metrics.inc("ultron_routing_decisions_total", persona=persona, tier=decision.tier, reason=decision.reason)
+            return decision
+
+    metrics.inc("ultron_routing_decisions_total", persona=persona, tier=large.tier, reason=large.reason)
+    return large
+
+
+def escalate(persona: str, persona_config: dict, route: RouteDecision, error: Exception):
+    """The small model failed before its first token (not pulled, crashed): use the large one."""
+    print(f"[WARN] Small model {route.model} failed for {persona} ({error}); falling back to {persona_config['model']}")
+    route.model = persona_config["model"]
+    route.max_tokens = persona_config["max_tokens"]
+    route.tier = "large"
+    route.reason = "small_model_failed"
+    metrics.inc("ultron_routing_decisions_total", persona=persona, tier=route.tier, reason=route.reason)
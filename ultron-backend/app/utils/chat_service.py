@@ -1,51 +1,218 @@
+import asyncio
+import time
+from contextlib import aclosing
+
+from fastapi import Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from app.services.chat_service import process_chat
 from app.models.chat_model import ChatRequest
 from app.services.local_chat_storage import save_message_locally
-from app.core.database import SessionLocal
+from app.core.admission import admission_controller, client_id_for, estimate_request_cost
+from app.core.config import HISTORY_MAX_TURNS, STREAM_COALESCE_MS, STREAM_COALESCE_BYTES, STREAM_FLUSH_FIRST, STREAM_GZIP
+from app.core.personas import get_persona
+from app.core.profiling import stage
+from app.core.streams import stream_registry
+from app.services.model_router import escalate, route_request
+from app.utils.stream_output import coalesce, sse_frames, gzip_stream
 
-db = SessionLocal()
 
-async def create_streaming_response(
-    model: str,
-    chat_id: str,
-    request: ChatRequest,
-    system_prompt: str | None = None
-):
-    full_response = ""
+def prior_turns(history: list, message: str) -> list:
+    # The frontend includes the message being sent as the last history entry
+    turns = list(history or [])
+    if turns and turns[-1].get("role") == "user" and turns[-1].get("content") == message:
+        turns = turns[:-1]
+    return turns[-HISTORY_MAX_TURNS:]
 
-    # ✅ Save user message first
-    await save_message_locally(
-        chat_id=chat_id,
-        role="user",
-        message=request.message
-    )
 
-    # Append user message to history if needed
-    updated_history = request.history + [{"role": "user", "content": request.message}]
+class ChatStreamSession:
+    """
+    One admitted generation, independent of the transport. The HTTP routes and the
+    WebSocket endpoint both iterate `output()`, the coalesced form of `chunks()`,
+    which persists the answer when the stream ends (with status "cancelled" if it
+    was cut short).
+    """
 
-    chat_stream = await process_chat(
-        message=request.message,
-        history=updated_history,
-        model=model,
-        system_prompt=system_prompt
-    )
+    def __init__(self, persona, chat_id, route, ticket, stream, source, usage):
+        self.persona = persona
+        self.chat_id = chat_id
+        self.route = route
+        self.ticket = ticket
+        self.stream = stream
+        self.source = source
+        self.full_response = ""
+        # Filled from Ollama's last chunk: prompt/completion tokens and duration
+        self.usage = usage
+        self.started = time.perf_counter()
+
+    @property
+    def headers(self) -> dict:
+        return {"X-Stream-Id": self.stream.id, "X-Model": self.route.model}
 
-    async def chat_generator():
-        async for chunk in chat_stream():
-            nonlocal full_response
-            full_response += chunk
-            yield chunk
+    async def chunks(self, is_disconnected=None):
+        stream = self.stream
+        try:
+            async for chunk in stream.iterate(self.source(), is_disconnected=is_disconnected):
+                self.full_response += chunk
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            # The transport went away while we were waiting on the model
+            stream.cancel("disconnected")
+            raise
+        finally:
+            self.finish()
+
+            if stream.cancelled:
+                stream.record_cancellation()
+                print(f"🛑 Stream {stream.id} cancelled ({stream.cancel_reason}) after {stream.tokens} chunks.")
+                await save_message_locally(
+                    chat_id=self.chat_id,
+                    role="assistant",
+                    message=self.full_response,
+                    status="cancelled",
+                )
+
+        if not stream.cancelled:
+            print("✅ Chat generation complete. Saving assistant message...")
+            await save_message_locally(
+                chat_id=self.chat_id,
+                role="assistant",
+                message=self.full_response
+            )
+
+    def summary(self) -> dict:
+        return {
+            "stream_id": self.stream.id,
+            "model": self.route.model,
+            "status": "cancelled" if self.stream.cancelled else "complete",
+            "chunks": self.stream.tokens,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "usage": self.usage,
+        }
+
+    def output(self, is_disconnected=None):
+        # Chunks as they should be written: coalesced over a small window
+        return coalesce(
+            self.chunks(is_disconnected=is_disconnected),
+            window_ms=STREAM_COALESCE_MS,
+            max_bytes=STREAM_COALESCE_BYTES,
+            flush_first=STREAM_FLUSH_FIRST,
+        )
+
+    def finish(self):
+        # Safe to call more than once; frees the generation slot right away
+        admission_controller.release(self.ticket)
+        stream_registry.close(self.stream)
+
+
+async def start_chat_stream(
+    persona: str,
+    chat_id: str,
+    message: str,
+    history: list,
+    filenames: list,
+    client_id: str,
+) -> ChatStreamSession:
+    persona_config = get_persona(persona)
+    history = prior_turns(history, message)
+    with stage("routing"):
+        route = route_request(persona, persona_config, message, history, filenames)
 
-    async def stream_and_save():
-        async for chunk in chat_generator():
-            yield chunk
+    # Raises 429/503 with Retry-After when this client, persona or the server is saturated
+    with stage("admission"):
+        ticket = await admission_controller.acquire(
+            client_id=client_id,
+            persona=persona,
+            cost=estimate_request_cost(message, history, route.max_tokens),
+        )
 
-        print("✅ Chat generation complete. Saving assistant message...")
+    usage = {}
+    try:
+        # ✅ Save user message first
         await save_message_locally(
             chat_id=chat_id,
-            role="assistant",
-            message=full_response
+            role="user",
+            message=message
         )
 
-    return StreamingResponse(stream_and_save(), media_type="text/plain")
+        async def open_stream():
+            with stage("ollama_connect"):
+                return await process_chat(
+                    message=message,
+                    history=history,
+                    model=route.model,
+                    system_prompt=persona_config["system_prompt"],
+                    max_tokens=route.max_tokens,
+                    usage=usage,
+                )
+
+        chat_stream = await open_stream()
+        if route.tier == "small":
+            chat_stream = _with_fallback(persona, persona_config, route, chat_stream, open_stream)
+    except BaseException:
+        admission_controller.release(ticket)
+        raise
+
+    stream = stream_registry.open(persona, chat_id, route.max_tokens)
+    return ChatStreamSession(persona, chat_id, route, ticket, stream, chat_stream, usage)
+
+
+def _with_fallback(persona, persona_config, route, small_stream, open_stream):
+    # Ollama only reports a missing or broken model on the first chunk, after the
+    # response has started, so the retry on the large model happens inside the stream
+    async def stream():
+        started = False
+        try:
+            async with aclosing(small_stream()) as chunks:
+                async for chunk in chunks:
+                    started = True
+                    yield chunk
+        except Exception as e:
+            if started:
+                raise
+            escalate(persona, persona_config, route, e)
+            large_stream = await open_stream()
+            async with aclosing(large_stream()) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    return stream
+
+
+async def create_streaming_response(
+    persona: str,
+    request: ChatRequest,
+    http_request: Request,
+):
+    session = await start_chat_stream(
+        persona=persona,
+        chat_id=request.chat_id,
+        message=request.message,
+        history=request.history,
+        filenames=request.filenames,
+        client_id=client_id_for(http_request),
+    )
+
+    body = session.output(is_disconnected=http_request.is_disconnected)
+    headers = dict(session.headers)
+
+    # Typed events (token/done/error) for clients that ask for them; plain text otherwise
+    if "text/event-stream" in http_request.headers.get("accept", "") or http_request.query_params.get("format") == "sse":
+        body = sse_frames(body, on_done=session.summary)
+        media_type = "text/event-stream"
+        headers["Cache-Control"] = "no-cache"
+    else:
+        media_type = "text/plain"
+
+    if STREAM_GZIP and "gzip" in http_request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    # The background task also cleans up if the body is never iterated
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(session.finish),
+    )
@@ -2,16 +2,22 @@
 
 import os
 from typing import Optional
-from docx import Document
-from PyPDF2 import PdfReader
-from PIL import Image
-import pytesseract
+
+from app.core.profiling import stage
+
+# The parsing libraries (python-docx, PyPDF2, Pillow, pytesseract) are heavy to
+# import and most requests never touch a file, so each one is imported on first use.
+
 
 def extract_text_from_docx(file_path: str) -> str:
+    from docx import Document
+
     doc = Document(file_path)
     return "\n".join([para.text for para in doc.paragraphs])
 
 def extract_text_from_pdf(file_path: str) -> str:
+    from PyPDF2 import PdfReader
+
     reader = PdfReader(file_path)
     return "\n".join([page.extract_text() or "" for page in reader.pages])
 
@@ -20,6 +26,9 @@ def extract_text_from_txt(file_path: str) -> str:
         return f.read()
 
 def extract_text_from_image(file_path: str) -> str:
+    from PIL import Image
+    import pytesseract
+
     image = Image.open(file_path)
     return pytesseract.image_to_string(image)
 
@@ -27,16 +36,17 @@ def parse_file(file_path: str) -> Optional[str]:
     ext = os.path.splitext(file_path)[1].lower()
 
     try:
-        if ext == ".pdf":
-            return extract_text_from_pdf(file_path)
-        elif ext == ".docx":
-            return extract_text_from_docx(file_path)
-        elif ext == ".txt":
-            return extract_text_from_txt(file_path)
-        elif ext in [".png", ".jpg", ".jpeg"]:
-            return extract_text_from_image(file_path)
-        else:
-            return None
+        with stage("parse_file"):
+            if ext == ".pdf":
+                return extract_text_from_pdf(file_path)
+            elif ext == ".docx":
+                return extract_text_from_docx(file_path)
+            elif ext == ".txt":
+                return extract_text_from_txt(file_path)
+            elif ext in [".png", ".jpg", ".jpeg"]:
+                return extract_text_from_image(file_path)
+            else:
+                return None
     except Exception as e:
         print(f"[ERROR] Failed to parse {file_path}: {e}")
         return None
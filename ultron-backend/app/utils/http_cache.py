@@ -0,0 +1,26 @@
+# app/utils/http_cache.py
+
+import hashlib
+
+from fastapi import Request, Response
+
+from app.core import metrics
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    wanted = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in wanted or etag.removeprefix("W/") in wanted
+
+
+def not_modified(etag: str, endpoint: str) -> Response:
+    metrics.inc("ultron_http_not_modified_total", endpoint=endpoint)
+    return Response(status_code=304, headers={"ETag": etag})
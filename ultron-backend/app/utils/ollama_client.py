@@ -1,8 +1,20 @@
 # app/utils/ollama_client.py
-import ollama
 from typing import AsyncGenerator
 from app.models.chat_model import ChatRequest
 
+_async_client = None
+
+
+def get_async_client():
+    # One shared AsyncClient keeps the HTTP connection pool to Ollama warm.
+    # Its streams are async generators, so closing them aborts the upstream request.
+    global _async_client
+    if _async_client is None:
+        import ollama
+
+        _async_client = ollama.AsyncClient()
+    return _async_client
+
 
 async def query_ollama_model(message: str, history: list[ChatRequest]) -> AsyncGenerator[str, None]:
     system_prompt = (
@@ -27,6 +39,8 @@ async def query_ollama_model(message: str, history: list[ChatRequest]) -> AsyncG
 
     messages.append({"role": "user", "content": message})
 
+    import ollama
+
     # Call Ollama in streaming mode
     stream = ollama.chat(
         model="llama3",
@@ -0,0 +1,101 @@
+# app/utils/stream_output.py
+
+import asyncio
+import json
+import zlib
+
+
+async def coalesce(chunks, window_ms: float, max_bytes: int, flush_first: bool = True):
+    """
+    Joins small chunks so each write carries several tokens.
+
+    A batch is flushed when it reaches `max_bytes`, when `window_ms` has passed since
+    its first chunk, or when the source ends. With `flush_first` the very first chunk
+    goes out on its own so time-to-first-token is unchanged. `window_ms=0` disables
+    coalescing.
+    """
+    if window_ms <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    buffer = []
+    state = {"size": 0, "finished": False, "error": None}
+    ready = asyncio.Event()  # the buffer has something in it
+    due = asyncio.Event()    # the batch is full or the source has ended
+
+    # One reader task per stream fills the buffer; the loop below only wakes once per batch
+    async def pump():
+        try:
+            async for chunk in chunks:
+                buffer.append(chunk)
+                state["size"] += len(chunk)
+                ready.set()
+                if state["size"] >= max_bytes:
+                    due.set()
+        except Exception as e:
+            state["error"] = e
+        finally:
+            state["finished"] = True
+            ready.set()
+            due.set()
+
+    reader = asyncio.create_task(pump())
+    first = flush_first
+    try:
+        while True:
+            await ready.wait()
+            if not first and not due.is_set():
+                timer = loop.call_later(window_ms / 1000, due.set)
+                await due.wait()
+                timer.cancel()
+            first = False
+
+            if buffer:
+                batch = "".join(buffer)
+                buffer.clear()
+                state["size"] = 0
+                if not state["finished"]:
+                    ready.clear()
+                    due.clear()
+                yield batch
+            elif state["finished"]:
+                break
+
+        if state["error"] is not None:
+            raise state["error"]
+    finally:
+        if not reader.done():
+            reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_frames(chunks, on_done):
+    """
+    Frames text chunks as typed server-sent events:
+      event: token  {"text": "..."}
+      event: done   on_done() -> usage and stream stats
+      event: error  {"detail": "..."}
+    """
+    try:
+        async for chunk in chunks:
+            yield sse_event("token", {"text": chunk})
+    except Exception as e:
+        print(f"[ERROR] Stream failed: {e}")
+        yield sse_event("error", {"detail": str(e) or e.__class__.__name__})
+        return
+    yield sse_event("done", on_done())
+
+
+async def gzip_stream(frames):
+    # Sync-flush after every frame so the client can decode it right away
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for frame in frames:
+        data = frame.encode("utf-8") if isinstance(frame, str) else frame
+        yield compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush(zlib.Z_FINISH)
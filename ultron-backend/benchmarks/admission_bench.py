@@ -0,0 +1,117 @@
+# benchmarks/admission_bench.py
+#
+# Synthetic overload test for the admission controller. Requests arrive as a
+# Poisson process faster than the simulated GPU can serve them; each one holds a
+# generation slot for a time proportional to its token count.
+#
+# Compares an unbounded queue (what the streaming routes did before) with the
+# AdmissionController and reports latency of admitted requests and rejections.
+#
+# Run from the ultron-backend directory:
+#   python benchmarks/admission_bench.py --rate 5 --duration 30
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.admission import AdmissionController, AdmissionRejected, estimate_request_cost  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def make_workload(rate: float, duration: float, clients: int, seed: int):
+    rng = random.Random(seed)
+    t, work = 0.0, []
+    while t < duration:
+        t += rng.expovariate(rate)
+        message = "x" * rng.randint(10, 2000)
+        max_tokens = rng.choice([256, 512, 1024])
+        work.append((t, f"client-{rng.randrange(clients)}", rng.choice(["llama3-chat", "deepseek-coder"]), message, max_tokens))
+    return work
+
+
+async def run(work, controller, slots, tokens_per_second):
+    latencies, statuses = [], {"ok": 0, 429: 0, 503: 0}
+    gpu = asyncio.Semaphore(slots)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(at, client, persona, message, max_tokens):
+        await asyncio.sleep(max(0.0, start + at - loop.time()))
+        began = loop.time()
+        ticket = None
+        if controller is not None:
+            try:
+                ticket = await controller.acquire(client, persona, estimate_request_cost(message, [], max_tokens))
+            except AdmissionRejected as e:
+                statuses[e.status_code] += 1
+                return
+        try:
+            async with gpu:
+                # Generated length is some fraction of max_tokens
+                await asyncio.sleep(max_tokens * random.uniform(0.2, 0.6) / tokens_per_second)
+        finally:
+            if ticket is not None:
+                controller.release(ticket)
+        statuses["ok"] += 1
+        latencies.append(loop.time() - began)
+
+    await asyncio.gather(*(one(*w) for w in work))
+    return latencies, statuses
+
+
+def report(name, latencies, statuses):
+    print(f"\n{name}")
+    print(f"   admitted: {statuses['ok']}   429: {statuses[429]}   503: {statuses[503]}")
+    if latencies:
+        print(
+            f"   latency p50 {percentile(latencies, 50):.2f}s   p99 {percentile(latencies, 99):.2f}s"
+            f"   max {max(latencies):.2f}s   mean {statistics.mean(latencies):.2f}s"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Admission control overload benchmark")
+    parser.add_argument("--rate", type=float, default=5.0, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals")
+    parser.add_argument("--slots", type=int, default=4, help="concurrent generations the GPU sustains")
+    parser.add_argument("--tokens-per-second", type=float, default=150.0, help="simulated decode speed per slot")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    work = make_workload(args.rate, args.duration, args.clients, args.seed)
+    print(f"🧪 {len(work)} requests over {args.duration:.0f}s ({args.rate}/s) against {args.slots} slots")
+
+    random.seed(args.seed)
+    report("Unbounded queue (no admission control)", *await run(work, None, args.slots, args.tokens_per_second))
+
+    controller = AdmissionController(
+        max_concurrent=args.slots,
+        max_queue=args.queue,
+        queue_timeout=args.queue_timeout,
+        client_rate=200,
+        client_burst=8000,
+        persona_rate=2000,
+        persona_burst=16000,
+    )
+    random.seed(args.seed)
+    report("AdmissionController", *await run(work, controller, args.slots, args.tokens_per_second))
+    print(f"   controller: {controller.snapshot()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
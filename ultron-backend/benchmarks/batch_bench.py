@@ -0,0 +1,85 @@
+# benchmarks/batch_bench.py
+#
+# Compares running N prompts through the batch job API with sending them one at a
+# time to the streaming chat route (the old way of doing offline work).
+# Needs a running backend and Ollama.
+#
+# Run from the ultron-backend directory:
+#   python benchmarks/batch_bench.py --prompts 40 --persona llama3-writing --category Writing
+
+import argparse
+import json
+import time
+
+import httpx
+
+SAMPLE_PROMPTS = [
+    "Summarize the benefits of unit testing in two sentences.",
+    "Write a haiku about a database migration.",
+    "Explain what a token bucket rate limiter is.",
+    "Give three tips for writing clear commit messages.",
+    "Rewrite this more formally: gonna ship the fix tmrw.",
+]
+
+
+def sequential(client: httpx.Client, prompts, persona: str, category: str):
+    chat = client.post("/chats/", json={"slug": category, "chat_name": "batch-bench"})
+    chat.raise_for_status()
+    chat_id = chat.json()["id"]
+
+    started = time.perf_counter()
+    for prompt in prompts:
+        body = {"category": category, "chat_id": chat_id, "message": prompt, "history": [], "filenames": []}
+        with client.stream("POST", f"/chat/{persona}/stream", json=body) as resp:
+            resp.raise_for_status()
+            for _ in resp.iter_bytes():
+                pass
+    elapsed = time.perf_counter() - started
+    client.delete(f"/chats/{chat_id}")
+    return elapsed
+
+
+def batch(client: httpx.Client, prompts, persona: str, poll: float):
+    payload = "\n".join(json.dumps({"prompt": p}) for p in prompts).encode()
+    started = time.perf_counter()
+    resp = client.post(
+        "/batch/jobs",
+        files={"file": ("prompts.jsonl", payload, "application/x-ndjson")},
+        data={"persona": persona},
+    )
+    resp.raise_for_status()
+    job_id = resp.json()["id"]
+
+    while True:
+        status = client.get(f"/batch/jobs/{job_id}").json()
+        if status["status"] in ("completed", "failed", "cancelled"):
+            break
+        time.sleep(poll)
+    return time.perf_counter() - started, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch API vs sequential streaming requests")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--prompts", type=int, default=20)
+    parser.add_argument("--persona", default="llama3-writing")
+    parser.add_argument("--category", default="Writing", help="category used for the sequential baseline chat")
+    parser.add_argument("--poll", type=float, default=0.5)
+    args = parser.parse_args()
+
+    prompts = [SAMPLE_PROMPTS[i % len(SAMPLE_PROMPTS)] + f" (#{i})" for i in range(args.prompts)]
+
+    with httpx.Client(base_url=args.base_url, timeout=None) as client:
+        seq_seconds = sequential(client, prompts, args.persona, args.category)
+        batch_seconds, status = batch(client, prompts, args.persona, args.poll)
+
+    print(f"\n🧪 {args.prompts} prompts with persona {args.persona}")
+    print(f"   sequential /chat/{args.persona}/stream: {seq_seconds:.1f}s ({args.prompts / seq_seconds:.2f} prompts/s)")
+    print(f"   batch job:                  {batch_seconds:.1f}s ({args.prompts / batch_seconds:.2f} prompts/s)")
+    print(f"   batch job status: {status['status']}, {status['completed']} ok, {status['failed']} failed, "
+          f"{status['tokens_per_second']} tokens/s")
+    print(f"   speedup: {seq_seconds / batch_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
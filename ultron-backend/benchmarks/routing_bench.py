@@ -0,0 +1,105 @@
+# benchmarks/routing_bench.py
+#
+# Replays a traffic log through the cascade router and, unless --dry-run is given,
+# through Ollama twice: once always using the persona's large model and once using
+# the routed model. Reports average latency and GPU-seconds per request
+# (Ollama's total_duration, i.e. time the runner spent on the request).
+#
+# The log can be chats.json (the old local chat dump) or a JSONL file with
+# {"message": "...", "persona"?: "...", "history"?: [...], "filenames"?: [...]} per line.
+#
+# Run from the ultron-backend directory:
+#   python benchmarks/routing_bench.py --log chats.json --persona llama3-chat --dry-run
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core import config  # noqa: E402
+from app.core.personas import get_persona  # noqa: E402
+from app.services.model_router import route_request  # noqa: E402
+
+
+def load_log(path: Path, default_persona: str) -> list:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        rows = []
+        for chat in json.loads(text):
+            message = chat.get("message")
+            user = message.get("user") if isinstance(message, dict) else message
+            if user:
+                rows.append({"message": user, "persona": default_persona})
+        return rows
+    return [
+        {"persona": default_persona, **json.loads(line)}
+        for line in text.splitlines() if line.strip()
+    ]
+
+
+def run(client, rows, routed: bool):
+    latencies, gpu_seconds = [], []
+    for row in rows:
+        persona_config = get_persona(row["persona"])
+        if routed:
+            route = route_request(row["persona"], persona_config, row["message"], row.get("history", []), row.get("filenames", []))
+            model, max_tokens = route.model, route.max_tokens
+        else:
+            model, max_tokens = persona_config["model"], persona_config["max_tokens"]
+
+        started = time.perf_counter()
+        response = client.chat(
+            model=model,
+            messages=[
+                {"role": "system", "content": persona_config["system_prompt"]},
+                {"role": "user", "content": row["message"]},
+            ],
+            options={"num_predict": max_tokens},
+        )
+        latencies.append(time.perf_counter() - started)
+        gpu_seconds.append((response.get("total_duration") or 0) / 1e9)
+    return latencies, gpu_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascade routing benchmark on a replayed traffic log")
+    parser.add_argument("--log", default="chats.json")
+    parser.add_argument("--persona", default="llama3-chat", help="persona for rows that do not name one")
+    parser.add_argument("--limit", type=int, default=0, help="replay at most N requests")
+    parser.add_argument("--dry-run", action="store_true", help="only show routing decisions")
+    args = parser.parse_args()
+    # Measure the cascade whatever the server default is
+    config.ROUTING_ENABLED = True
+
+    rows = load_log(Path(args.log), args.persona)
+    if args.limit:
+        rows = rows[: args.limit]
+
+    decisions = Counter()
+    for row in rows:
+        route = route_request(row["persona"], get_persona(row["persona"]), row["message"], row.get("history", []), row.get("filenames", []))
+        decisions[(route.tier, route.model, route.reason)] += 1
+
+    print(f"\n🧭 Routing decisions for {len(rows)} requests")
+    for (tier, model, reason), count in decisions.most_common():
+        print(f"   {count:>5}  {tier:<5}  {model:<22}  {reason}")
+    if args.dry_run:
+        return
+
+    import ollama
+
+    client = ollama.Client()
+    for name, routed in (("always large model", False), ("cascade routing", True)):
+        latencies, gpu = run(client, rows, routed)
+        print(f"\n{name}")
+        print(f"   avg latency {statistics.mean(latencies):.2f}s   p95 {sorted(latencies)[int(0.95 * (len(latencies) - 1))]:.2f}s")
+        print(f"   avg GPU-seconds/request {statistics.mean(gpu):.2f}   total {sum(gpu):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/startup_bench.py
+#
+# Measures cold start of the backend:
+#   1. import-time breakdown of `app.main` (python -X importtime)
+#   2. time from process spawn until the first request is served
+#
+# Run from the ultron-backend directory:
+#   python benchmarks/startup_bench.py --top 25 --runs 3
+
+import argparse
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def import_breakdown(top: int):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit("❌ Importing app.main failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:   self |   cumulative |   <indent>module"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    # Imports made directly by app.main have the smallest indent in the importtime output
+    min_indent = min(len(r[2]) - len(r[2].lstrip()) for r in rows)
+    top_level = [r for r in rows if len(r[2]) - len(r[2].lstrip()) == min_indent]
+    total = sum(r[0] for r in top_level)
+    print(f"\n📦 import app.main: {total / 1000:.1f} ms total\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_us, name in sorted(rows, key=lambda r: r[0], reverse=True)[:top]:
+        print(f"{cumulative / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}")
+    return total / 1000
+
+
+def time_to_first_request(port: int, path: str, timeout: float):
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+    )
+    url = f"http://127.0.0.1:{port}{path}"
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise SystemExit(f"❌ {url} did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark for the Ultron backend")
+    parser.add_argument("--top", type=int, default=20, help="number of modules to list")
+    parser.add_argument("--runs", type=int, default=3, help="server cold starts to measure")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/health/live", help="first request to serve")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    import_breakdown(args.top)
+
+    samples = [time_to_first_request(args.port, args.path, args.timeout) for _ in range(args.runs)]
+    print(f"\n🚀 time to first served request ({args.path}):")
+    for i, s in enumerate(samples, 1):
+        print(f"   run {i}: {s * 1000:.0f} ms")
+    print(f"   best: {min(samples) * 1000:.0f} ms, mean: {sum(samples) / len(samples) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/stream_output_bench.py
+#
+# Server-side cost and client-perceived smoothness of the streaming output stage.
+# Many concurrent synthetic token streams (one token every --gap ms, like a model
+# decoding) are pushed through each configuration and written, with HTTP chunked
+# framing, to a real local socket per stream (one send syscall per write, like the
+# ASGI server does). Reported per configuration:
+#   - CPU ms per 1k streamed tokens (process time, includes the event loop)
+#   - writes per 1k tokens (each write is an ASGI send + syscall in production)
+#   - gap between writes seen by the client: median, p99 and max
+#   - time to first write
+#
+# Run from the ultron-backend directory:
+#   python benchmarks/stream_output_bench.py --streams 200 --tokens 300
+
+import argparse
+import asyncio
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.stream_output import coalesce, gzip_stream, sse_frames  # noqa: E402
+
+TOKENS = ["The", " quick", " brown", " fox", " jumps", " over", " the", " lazy", " dog", ".", "\n"]
+
+
+async def token_source(n: int, gap: float):
+    for i in range(n):
+        await asyncio.sleep(gap)
+        yield TOKENS[i % len(TOKENS)]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * (len(values) - 1)))]
+
+
+async def drain(reader):
+    while await reader.read(65536):
+        pass
+
+
+async def one_stream(build, tokens: int, gap: float, stats: dict):
+    server_sock, client_sock = socket.socketpair()
+    _, writer = await asyncio.open_connection(sock=server_sock)
+    client_reader, client_writer = await asyncio.open_connection(sock=client_sock)
+    drainer = asyncio.create_task(drain(client_reader))
+
+    started = time.perf_counter()
+    last = None
+    async for frame in build(token_source(tokens, gap)):
+        data = frame.encode("utf-8") if isinstance(frame, str) else frame
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+        now = time.perf_counter()
+        if last is None:
+            stats["ttft"].append(now - started)
+        else:
+            stats["gaps"].append(now - last)
+        last = now
+        stats["writes"] += 1
+
+    writer.close()
+    await drainer
+    client_writer.close()
+
+
+async def run(name, build, streams, tokens, gap):
+    stats = {"writes": 0, "gaps": [], "ttft": []}
+    cpu = time.process_time()
+    await asyncio.gather(*(one_stream(build, tokens, gap, stats) for _ in range(streams)))
+    cpu = time.process_time() - cpu
+
+    total_tokens = streams * tokens
+    print(f"\n{name}")
+    print(f"   CPU per 1k tokens   {cpu / total_tokens * 1000 * 1000:.1f} ms")
+    print(f"   writes per 1k tokens {stats['writes'] / total_tokens * 1000:.0f}")
+    print(
+        f"   write gaps          median {statistics.median(stats['gaps']) * 1000:.0f} ms"
+        f"   p99 {percentile(stats['gaps'], 99) * 1000:.0f} ms   max {max(stats['gaps']) * 1000:.0f} ms"
+    )
+    print(f"   time to first write median {statistics.median(stats['ttft']) * 1000:.0f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Streaming output stage benchmark")
+    parser.add_argument("--streams", type=int, default=200, help="concurrent streams")
+    parser.add_argument("--tokens", type=int, default=300, help="tokens per stream")
+    parser.add_argument("--gap", type=float, default=15.0, help="ms between tokens")
+    parser.add_argument("--window", type=float, default=25.0, help="coalescing window in ms")
+    parser.add_argument("--bytes", type=int, default=256, help="coalescing byte limit")
+    args = parser.parse_args()
+    gap = args.gap / 1000
+
+    def done():
+        return {"status": "complete"}
+
+    configs = [
+        ("plain text, one write per token (before)", lambda src: src),
+        ("SSE, one event per token", lambda src: sse_frames(src, done)),
+        ("plain text, coalesced", lambda src: coalesce(src, args.window, args.bytes)),
+        ("SSE, coalesced", lambda src: sse_frames(coalesce(src, args.window, args.bytes), done)),
+        ("SSE, coalesced + gzip", lambda src: gzip_stream(sse_frames(coalesce(src, args.window, args.bytes), done))),
+    ]
+    print(f"🧪 {args.streams} streams x {args.tokens} tokens, one token every {args.gap:.0f} ms")
+    for name, build in configs:
+        await run(name, build, args.streams, args.tokens, gap)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
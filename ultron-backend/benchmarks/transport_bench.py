@@ -0,0 +1,104 @@
+# benchmarks/transport_bench.py
+#
+# Per-turn overhead of the HTTP POST stream route versus the WebSocket transport.
+# Runs the same short conversation through both and reports, per turn:
+#   - time to first token
+#   - total turn time
+#   - request bytes sent by the client (the POST body grows with the history,
+#     the WebSocket frame carries only the new message)
+# Needs a running backend and Ollama, plus `pip install websockets httpx`.
+#
+# Run from the ultron-backend directory:
+#   python benchmarks/transport_bench.py --turns 10 --persona llama3-chat --category Chat
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+import websockets
+
+PROMPTS = ["hi", "what is 2 + 2?", "thanks", "and 3 + 3?", "ok bye"]
+
+
+async def create_chat(client: httpx.AsyncClient, category: str) -> str:
+    resp = await client.post("/chats/", json={"slug": category, "chat_name": "transport-bench"})
+    resp.raise_for_status()
+    return resp.json()["id"]
+
+
+async def http_turns(client, persona, chat_id, category, turns):
+    history, rows = [], []
+    for i in range(turns):
+        message = PROMPTS[i % len(PROMPTS)]
+        history.append({"role": "user", "content": message})
+        body = json.dumps({
+            "category": category, "chat_id": chat_id, "message": message, "history": history, "filenames": [],
+        })
+        started = time.perf_counter()
+        first, answer = None, ""
+        async with client.stream(
+            "POST", f"/chat/{persona}/stream", content=body, headers={"Content-Type": "application/json"}
+        ) as resp:
+            async for text in resp.aiter_text():
+                first = first or time.perf_counter()
+                answer += text
+        rows.append((first - started if first else float("nan"), time.perf_counter() - started, len(body)))
+        history.append({"role": "assistant", "content": answer})
+    return rows
+
+
+async def ws_turns(url, persona, chat_id, turns, origin):
+    rows = []
+    # /ws/chat only accepts the origins in ALLOWED_ORIGINS
+    async with websockets.connect(url, origin=origin) as ws:
+        for i in range(turns):
+            frame = json.dumps({
+                "type": "chat", "id": f"t{i}", "persona": persona, "chat_id": chat_id, "message": PROMPTS[i % len(PROMPTS)],
+            })
+            started = time.perf_counter()
+            first = None
+            await ws.send(frame)
+            while True:
+                event = json.loads(await ws.recv())
+                if event.get("id") != f"t{i}":
+                    continue
+                if event["type"] == "token":
+                    first = first or time.perf_counter()
+                elif event["type"] in ("done", "error"):
+                    break
+            rows.append((first - started if first else float("nan"), time.perf_counter() - started, len(frame)))
+    return rows
+
+
+def report(name, rows):
+    ttft, total, sent = zip(*rows)
+    print(f"\n{name}")
+    print(f"   time to first token  mean {statistics.mean(ttft) * 1000:.0f} ms   median {statistics.median(ttft) * 1000:.0f} ms")
+    print(f"   turn time            mean {statistics.mean(total) * 1000:.0f} ms")
+    print(f"   request bytes/turn   mean {statistics.mean(sent):.0f}   last turn {sent[-1]}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="HTTP POST vs WebSocket per-turn overhead")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--persona", default="llama3-chat")
+    parser.add_argument("--category", default="Chat")
+    parser.add_argument("--origin", default="http://localhost:5173", help="Origin header for the WebSocket handshake")
+    args = parser.parse_args()
+
+    ws_url = args.base_url.replace("http", "ws", 1) + "/ws/chat"
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        http_chat = await create_chat(client, args.category)
+        ws_chat = await create_chat(client, args.category)
+        report("HTTP POST /chat/.../stream", await http_turns(client, args.persona, http_chat, args.category, args.turns))
+        report("WebSocket /ws/chat", await ws_turns(ws_url, args.persona, ws_chat, args.turns, args.origin))
+        await client.delete(f"/chats/{http_chat}")
+        await client.delete(f"/chats/{ws_chat}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())